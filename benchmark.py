@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Script:	benchmark.py
+Date:	2026-10-17
+
+Platform: macOS/Windows/Linux
+
+Description:
+Benchmark the boggle puzzle solver and dictionary builder
+Solves the same seeded boards on every run so results can be compared between versions
+
+"""
+__author__ = "thedzy"
+__copyright__ = "Copyright 2020, thedzy"
+__license__ = "GPL"
+__version__ = "1.0.0"
+__maintainer__ = "thedzy"
+__email__ = "thedzy@hotmail.com"
+__status__ = "Development"
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import boggle_solver
+from boggle_solver import Solver, make_puzzle
+from convert_dictionary import CompactDictionary, build_compact, load_dictionary, read_words
+
+# Filters solved with on every board, keyword arguments to Solver.solve
+FILTERS: dict[str, dict[str, Any]] = {
+    'none': {},
+    'filter': {'word_filter': '.*(s|ed|ing)'},
+    'contains': {'contains': ['e', 'r|t']},
+    'both': {'word_filter': '[^aeiou].*', 'contains': ['a']},
+}
+# Change in latency or node rate reported as a regression when comparing
+REGRESSION_THRESHOLD = 0.10
+
+
+def main() -> None:
+    word_lists: list[str] = options.word_lists or [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                                                   for name in ('aspell.txt', 'collins_scrabble_words_2019.txt')]
+    boards: list[tuple[str, list[list[str]]]] = make_boards(options.seed, options.boards, options.sizes)
+
+    results: dict[str, Any] = {'version': boggle_solver.__version__,
+                               'python': platform.python_version(),
+                               'platform': platform.platform(),
+                               'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                               'seed': options.seed,
+                               'boards': options.boards,
+                               'engine': options.engine,
+                               'prune': options.prune,
+                               'dictionaries': {},
+                               'runs': {}}
+
+    with tempfile.TemporaryDirectory() as directory:
+        for word_list in word_lists:
+            name: str = os.path.splitext(os.path.basename(word_list))[0]
+            path: str = os.path.join(directory, f'{name}.bg')
+
+            print(f'Building {name}', file=sys.stderr)
+            dictionary_stats: dict[str, Any] = benchmark_build(word_list, path)
+            solver: Solver = benchmark_load(path, dictionary_stats)
+            results['dictionaries'][name] = dictionary_stats
+
+            for board_name in dict.fromkeys(board_name for board_name, _ in boards):
+                for filter_name, filter_options in FILTERS.items():
+                    key: str = f'{name}/{board_name}/{filter_name}'
+                    print(f'Solving {key}', file=sys.stderr)
+                    puzzles: list[list[list[str]]] = [puzzle for puzzle_name, puzzle in boards if puzzle_name == board_name]
+                    results['runs'][key] = benchmark_solve(solver, puzzles, filter_options)
+
+    results['max_rss'] = max_rss()
+
+    print_results(results)
+    if options.compare:
+        print_comparison(json.load(options.compare), results)
+    if options.output:
+        json.dump(results, options.output, indent=2)
+        options.output.write('\n')
+
+
+def make_boards(seed: int, count: int, sizes: list[int]) -> list[tuple[str, list[list[str]]]]:
+    """
+    Make the boards to solve, the same for the same seed
+    :param seed: Random seed
+    :param count: Number of boards of each kind
+    :param sizes: Sizes of the weighted random boards, ex: 4 is 4x4
+    :return: Board kind and puzzle matrix
+    """
+    state: tuple = random.getstate()
+    random.seed(seed)
+    boards: list[tuple[str, list[list[str]]]] = [('standard', make_puzzle([], standard=True)) for _ in range(count)]
+    for size in sizes:
+        boards.extend((f'{size}x{size}', make_puzzle([], size)) for _ in range(count))
+    random.setstate(state)
+    return boards
+
+
+def benchmark_build(word_list: str, path: str) -> dict[str, Any]:
+    """
+    Build a compact dictionary from a word list, as convert_dictionary.py does
+    :param word_list: Path of the word list
+    :param path: Path to write the dictionary to
+    :return: Build time, peak memory, word and node counts
+    """
+    tracemalloc.start()
+    start_time: float = time.perf_counter()
+    with open(word_list) as source:
+        dictionary: CompactDictionary = build_compact([read_words(source)])
+    with open(path, 'wb') as file:
+        dictionary.write(file)
+    build_time: float = time.perf_counter() - start_time
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'word_list': word_list,
+            'words': sum(1 for _, word in dictionary.entries() if word),
+            'nodes': dictionary.node_count,
+            'edges': dictionary.edge_count,
+            'file_size': os.path.getsize(path),
+            'build_time': build_time,
+            'build_peak_memory': peak}
+
+
+def benchmark_load(path: str, dictionary_stats: dict[str, Any]) -> Solver:
+    """
+    Load a dictionary into a solver, adding the load time and memory to the dictionary stats
+    :param path: Path of the dictionary
+    :param dictionary_stats: Stats of the dictionary
+    :return: Solver
+    """
+    tracemalloc.start()
+    start_time: float = time.perf_counter()
+    solver: Solver = Solver(load_dictionary(open(path, 'rb')), options.engine, prune=options.prune)
+    dictionary_stats['load_time'] = time.perf_counter() - start_time
+    _, dictionary_stats['load_peak_memory'] = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return solver
+
+
+def benchmark_solve(solver: Solver, puzzles: list[list[list[str]]], filter_options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Solve puzzles, timing each
+    Memory is traced on a separate solve of the first puzzle, tracing slows the search
+    :param solver: Solver
+    :param puzzles: Puzzle matrices
+    :param filter_options: Filters to solve with
+    :return: Latency percentiles, node rate, word counts and peak memory
+    """
+    latencies: list[float] = []
+    search_time, nodes, words = 0.0, 0, 0
+    for puzzle in puzzles:
+        start_time: float = time.perf_counter()
+        results: dict[str, Any] = solver.solve(puzzle, length_min=options.length_min, **filter_options)
+        latencies.append(time.perf_counter() - start_time)
+        search_time += results['stats']['search_time']
+        nodes += results['stats']['nodes_visited']
+        words += results['stats']['word_count']
+
+    tracemalloc.start()
+    solver.solve(puzzles[0], length_min=options.length_min, **filter_options)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {'puzzles': len(puzzles),
+            'latency': {'mean': statistics.fmean(latencies),
+                        'min': latencies[0],
+                        'p50': percentile(latencies, 0.50),
+                        'p90': percentile(latencies, 0.90),
+                        'p99': percentile(latencies, 0.99),
+                        'max': latencies[-1]},
+            'nodes_visited': nodes,
+            'nodes_per_second': nodes / search_time if search_time else 0.0,
+            'words_per_puzzle': words / len(puzzles),
+            'peak_memory': peak}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Get a percentile of sorted values, the nearest value below
+    :param values: Sorted values
+    :param fraction: Percentile as a fraction, ex: 0.9
+    :return: Value
+    """
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def max_rss() -> int | None:
+    """
+    Get the peak resident memory of the process
+    :return: Bytes, None where not available
+    """
+    if resource is None:
+        return None
+    rss: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes except on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def print_results(results: dict[str, Any]) -> None:
+    """
+    Print a summary of a benchmark
+    :param results: Benchmark results
+    :return: (void)
+    """
+    for name, stats in results['dictionaries'].items():
+        print(f'{name}: {stats["words"]} words, {stats["nodes"]} nodes, '
+              f'built in {stats["build_time"]:0.3f}s ({stats["build_peak_memory"] / 2 ** 20:0.1f}MiB), '
+              f'loaded in {stats["load_time"] * 1000:0.2f}ms')
+    print()
+    print(f'{"Run":50} {"p50 ms":>10} {"p90 ms":>10} {"p99 ms":>10} {"nodes/s":>12} {"words":>8} {"MiB":>8}')
+    for key, run in results['runs'].items():
+        print(f'{key:50} {run["latency"]["p50"] * 1000:10.2f} {run["latency"]["p90"] * 1000:10.2f} '
+              f'{run["latency"]["p99"] * 1000:10.2f} {run["nodes_per_second"]:12.0f} {run["words_per_puzzle"]:8.1f} '
+              f'{run["peak_memory"] / 2 ** 20:8.2f}')
+    if results['max_rss']:
+        print(f'\nPeak resident memory {results["max_rss"] / 2 ** 20:0.1f}MiB')
+
+
+def print_comparison(baseline: dict[str, Any], results: dict[str, Any]) -> None:
+    """
+    Compare a benchmark against an earlier one, marking regressions
+    :param baseline: Earlier benchmark results
+    :param results: Benchmark results
+    :return: (void)
+    """
+    if (baseline['seed'], baseline['boards']) != (results['seed'], results['boards']):
+        print('\nBaseline was run with a different seed or board count, boards differ', file=sys.stderr)
+
+    print(f'\nCompared to {baseline["version"]} run at {baseline["time"]}')
+    print(f'{"Run":50} {"p50":>10} {"p99":>10} {"nodes/s":>10}')
+    regressions: int = 0
+    for key, run in results['runs'].items():
+        if key not in baseline['runs']:
+            continue
+        changes: list[float] = [change(baseline['runs'][key]['latency']['p50'], run['latency']['p50']),
+                                change(baseline['runs'][key]['latency']['p99'], run['latency']['p99']),
+                                -change(baseline['runs'][key]['nodes_per_second'], run['nodes_per_second'])]
+        regressed: bool = any(value > options.threshold for value in changes)
+        regressions += regressed
+        print(f'{key:50} ' + ' '.join(f'{value:+10.1%}' for value in changes) + (' REGRESSED' if regressed else ''))
+
+    for name, stats in results['dictionaries'].items():
+        if name in baseline['dictionaries']:
+            print(f'{name}: build {change(baseline["dictionaries"][name]["build_time"], stats["build_time"]):+0.1%}, '
+                  f'load {change(baseline["dictionaries"][name]["load_time"], stats["load_time"]):+0.1%}')
+    print(f'{regressions} regressions over {options.threshold:0.0%}')
+
+
+def change(before: float, after: float) -> float:
+    """
+    Get the relative change between two measurements
+    :param before: Earlier measurement
+    :param after: Later measurement
+    :return: Change as a fraction of the earlier measurement
+    """
+    return (after - before) / before if before else 0.0
+
+
+if __name__ == '__main__':
+    def parser_formatter(format_class, **kwargs):
+        """
+        Use a raw parser to use line breaks, etc
+        :param format_class: (class) formatting class
+        :param kwargs: (dict) kwargs for class
+        :return: (class) formatting class
+        """
+        try:
+            return lambda prog: format_class(prog, **kwargs)
+        except TypeError:
+            return format_class
+
+
+    parser = argparse.ArgumentParser(description='Benchmark the boggle solver on seeded boards',
+                                     formatter_class=parser_formatter(
+                                         argparse.RawTextHelpFormatter,
+                                         indent_increment=4, max_help_position=12, width=160))
+
+    parser.add_argument('-w', '--word-list', type=str,
+                        action='append', dest='word_lists', default=[],
+                        metavar='PATH',
+                        help='Word list to build and solve with, can be repeated\n'
+                             'Default: aspell.txt and collins_scrabble_words_2019.txt')
+    parser.add_argument('-b', '--boards', type=int,
+                        action='store', dest='boards', default=10,
+                        metavar='COUNT',
+                        help='Number of boards of each size\n'
+                             'Default: %(default)s')
+    parser.add_argument('-s', '--sizes', type=int,
+                        action='store', dest='sizes', default=[4, 5, 6, 8, 12, 20], nargs='+',
+                        metavar='SIZE',
+                        help='Sizes of random boards, standard boards are always included\n'
+                             'Default: 4 5 6 8 12 20')
+    parser.add_argument('--seed', type=int,
+                        action='store', dest='seed', default=2020,
+                        help='Seed for the boards, the same seed solves the same boards\n'
+                             'Default: %(default)s')
+    parser.add_argument('-m', '--min', type=int,
+                        action='store', dest='length_min', default=3,
+                        metavar='LENGTH',
+                        help='Minimum word length\n'
+                             'Default: %(default)s')
+    parser.add_argument('--engine', choices=['single', 'frontier', 'legacy'],
+                        action='store', dest='engine', default='single',
+                        help='Search engine\n'
+                             'Default: %(default)s')
+    parser.add_argument('--prune',
+                        action='store_true', dest='prune', default=False,
+                        help='Search dictionaries pruned to the letters of each puzzle\n'
+                             'Default: %(default)s')
+
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'),
+                        action='store', dest='output', default=None,
+                        metavar='PATH',
+                        help='Save the results as JSON')
+    parser.add_argument('-c', '--compare', type=argparse.FileType('r'),
+                        action='store', dest='compare', default=None,
+                        metavar='PATH',
+                        help='Compare against results saved with -o')
+    parser.add_argument('-t', '--threshold', type=float,
+                        action='store', dest='threshold', default=REGRESSION_THRESHOLD,
+                        metavar='FRACTION',
+                        help='Slow down reported as a regression when comparing\n'
+                             'Default: %(default)s')
+
+    options = parser.parse_args()
+
+    main()
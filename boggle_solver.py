@@ -13,26 +13,69 @@ Find all the words in a given/generated puzzle
 __author__ = "thedzy"
 __copyright__ = "Copyright 2020, thedzy"
 __license__ = "GPL"
-__version__ = "1.6.1"
+__version__ = "1.8.0"
 __maintainer__ = "thedzy"
 __email__ = "thedzy@hotmail.com"
 __status__ = "Development"
 
 import argparse
+import collections
+import cProfile
 import ctypes
+import functools
+import hashlib
+import heapq
+import http.server
+import itertools
 import json
 import math
+import multiprocessing
+import multiprocessing.pool
 import os
 import pickle
 import platform
 import pprint
+import pstats
 import random
 import re
+import socketserver
+import statistics
 import sys
+import threading
 import time
-from typing import Any
+from typing import Any, Callable, Iterator
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# Only needed by the frontier engine
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from convert_dictionary import FLAG_WORD, NO_WORD, CompactDictionary, DictionaryBuilder, load_dictionary
 
 SPEED_STEPS = 50
+# Number of recent request latencies kept by the server for its stats
+SERVE_LATENCY_HISTORY = 10000
+# Puzzles handed to a batch worker at a time
+BATCH_CHUNK_SIZE = 8
+# Number of dictionaries pruned to a puzzle's letters that are kept
+PRUNE_CACHE_SIZE = 64
+# Functions listed when printing a profile
+PROFILE_LINES = 25
+# Results kept in memory by a result cache
+RESULT_CACHE_SIZE = 1024
+# Points for a word by its length in letters, longer words score the last
+WORD_SCORES = (0, 0, 0, 1, 1, 2, 3, 5, 11)
+
+# Solvers loaded by each batch worker
+batch_solvers: dict[str, 'Solver'] = {}
+# Puzzle and options of the search, in each tile search worker
+tile_search: dict[str, Any] = {}
 
 
 def main() -> None:
@@ -53,11 +96,17 @@ def main() -> None:
     """
     Processing options
     """
-    # Load dictionary
     try:
-        tree_dictionary: dict[str, str] = pickle.load(options.dictionary)
-        options.dictionary.close()
-    except (UnicodeDecodeError, EOFError):
+        check_engine(options.engine)
+    except ValueError as err:
+        print_error('Engine not available', str(err))
+
+    # Load dictionary, compact dictionaries are mapped rather than read
+    try:
+        # Results only outlast a single puzzle when kept in a directory
+        cache: ResultCache | None = ResultCache(options.cache_size, options.cache_dir) if options.cache_dir else None
+        solver: Solver = Solver(load_union(options.dictionary), options.engine, options.workers or 1, options.prune, cache)
+    except (UnicodeDecodeError, EOFError, ValueError, pickle.UnpicklingError):
         print_error('Dictionary may be corrupt or not a dictionary',
                     'Verify file or reprocess dictionary')
     except Exception as err:
@@ -65,116 +114,50 @@ def main() -> None:
 
     # Get stat
     dictionary_load_time = time.time() - start_time
+    if len(options.dictionary) > 1:
+        # Merged on every run, a union built once is mapped like any other dictionary
+        print(f'Merged {len(options.dictionary)} dictionaries in {dictionary_load_time:0.3f}s, build them into one with '
+              f'"convert_dictionary.py -u {" ".join(file.name for file in options.dictionary)} -d PATH" '
+              f'and give that to -d to load without merging', file=sys.stderr)
 
     # Validate regex before continuing
-    if options.filter:
+    for pattern in ([options.filter] if options.filter else []) + (options.filter_contains or []):
         try:
-            pattern: re.Pattern[Any | str] = re.compile(options.filter, re.IGNORECASE)
+            re.compile(pattern, re.IGNORECASE)
         except re.error as err:
             print_error('Error in regex statement', err.msg.title())
 
-    # Get/make the puzzle
-    if options.puzzle_standard:
-        dies: dict[int, list[str]] = {
-            0: ['A', 'A', 'E', 'E', 'G', 'N'],
-            1: ['A', 'B', 'B', 'J', 'O', 'O'],
-            2: ['A', 'C', 'H', 'O', 'P', 'S'],
-            3: ['A', 'F', 'F', 'K', 'P', 'S'],
-            4: ['A', 'O', 'O', 'T', 'T', 'W'],
-            5: ['C', 'I', 'M', 'O', 'T', 'U'],
-            6: ['D', 'E', 'I', 'L', 'R', 'X'],
-            7: ['D', 'E', 'L', 'R', 'V', 'Y'],
-            8: ['D', 'I', 'S', 'T', 'T', 'Y'],
-            9: ['E', 'E', 'G', 'H', 'N', 'W'],
-            10: ['E', 'E', 'I', 'N', 'S', 'U'],
-            11: ['E', 'H', 'R', 'T', 'V', 'W'],
-            12: ['E', 'I', 'O', 'S', 'S', 'T'],
-            13: ['E', 'L', 'R', 'T', 'T', 'Y'],
-            14: ['H', 'I', 'M', 'N', 'U', 'Qu'],
-            15: ['H', 'L', 'N', 'N', 'R', 'Z'],
-        }
+    # Words are printed before they can be ordered or typed
+    if options.stream and any([options.order_alpha, options.order_size, options.order_size_r, options.enter]):
+        print_error('Words cannot be ordered or typed when streaming', 'Remove -a/-o/-r/-e or --stream')
 
-        puzzle_letters: list[str] = []
-        while len(dies) > 0:
-            random_index = random.choice(list(dies.keys()))
-            popped_die = dies.pop(random_index)
-
-            puzzle_letter: str = random.choice(popped_die)
-            puzzle_letters.append(puzzle_letter)
-
-        puzzle: list[list[str]] = []
-        row_count: int = 4
-        random.shuffle(puzzle_letters)
-        for puzzle_x in range(0, row_count):
-            row: list[str] = []
-            for puzzle_y in range(0, row_count):
-                row.append(puzzle_letters[puzzle_x * row_count + puzzle_y].lower())
-            puzzle.append(row)
-    else:
-        letters: list[str] = ['a', 'b', 'c', 'd', 'e', 'f', 'g',
-                              'h', 'i', 'j', 'k', 'l', 'm', 'n',
-                              'o', 'p', 'qu', 'r', 's', 't', 'u',
-                              'v', 'w', 'x', 'y', 'z']
-        # Weight the letters for the presence in the english language
-        weights: dict[str, float] = {
-            'a': 6.5, 'b': 1.2, 'c': 2.2, 'd': 3.4, 'e': 10,
-            'f': 1.7, 'g': 1.6, 'h': 4.8, 'i': 5.5, 'j': 0.2,
-            'k': 0.6, 'l': 3.1, 'm': 1.9, 'n': 5.3, 'o': 5.9,
-            'p': 1.5, 'q': 0.1, 'r': 4.7, 's': 6.3, 't': 7.2,
-            'u': 2.2, 'v': 0.8, 'w': 1.9, 'x': 0.2, 'y': 1.6, 'z': 0.3,
-        }
-
-        # Get size and generate missing tiles
-        puzzle_characters:list[str] = list(options.puzzle[0]) if len(options.puzzle) == 1 else options.puzzle
-        size:int = len(puzzle_characters) if len(options.puzzle) > options.puzzle_size ** 2 else options.puzzle_size ** 2
-
-        generator_count: int = size - len(puzzle_characters)
-        puzzle_characters.extend(random.choices(letters, weights=[w[1] for w in weights.items()], k=generator_count))
-
-        puzzle_length: int = len(puzzle_characters)
-        row_count: int = int(math.sqrt(puzzle_length))
-        if not math.sqrt(puzzle_length).is_integer():
-            row_count: int = math.ceil(math.sqrt(puzzle_length))
-            generator_count_square: int = (row_count**2) - len(puzzle_characters)
-            puzzle_characters.extend(random.choices(letters, weights=[w[1] for w in weights.items()], k=generator_count_square))
-            print(f'Extending puzzle letters by {generator_count_square} to make a puzzle', file=sys.stderr)
-
-        if options.randomise:
-            random.shuffle(puzzle_characters)
-
-        # Create a matrix of tiles
-        puzzle: list[list[str]] = []
-        for _ in range(row_count):
-            puzzle.append(puzzle_characters[0:row_count])
-            puzzle_characters = puzzle_characters[row_count:]
-
-    # Set the max/min length of a word
-    length_max: int = min(row_count ** 2, 32)
-    length_min: int = 3
-    if options.length:
-        length_min = length_max = options.length
-    else:
-        # Max word length of the puzzle size or 32, whichever is smaller
-        if options.length_max:
-            length_max: int = options.length_max
-
-        if options.length_min:
-            length_min: int = options.length_min
+    # Get/make the puzzle, a tile for each cell of the adjacency, laid out as a single row
+    topology: str | list[list[int]] = 'torus' if options.torus else 'grid'
+    columns: int | None = options.columns
+    if options.adjacency:
+        try:
+            topology = json.load(options.adjacency)
+        except ValueError as err:
+            print_error('Adjacency is not JSON', str(err))
+        columns = len(topology) if isinstance(topology, list) else None
+    puzzle: list[list[str]] = make_puzzle(options.puzzle, options.puzzle_size, options.puzzle_standard, options.randomise,
+                                          columns)
+    column_count: int = len(puzzle[0])
+    try:
+        board_neighbours(puzzle, topology)
+    except ValueError as err:
+        print_error('Adjacency does not fit the puzzle', str(err))
+    if options.engine == 'legacy' and (topology != 'grid' or len(puzzle) != column_count):
+        print_error('The legacy engine only searches square grids', 'Use another engine')
+    if options.deadline is not None and (options.engine == 'legacy' or options.deadline <= 0):
+        print_error('Deadline must be more than 0 seconds, the legacy engine has none', 'Change --deadline or --engine')
+    if options.top is not None and (options.engine == 'legacy' or options.top < 1):
+        print_error('Top must be at least 1 word, the legacy engine finds every word', 'Change --top or --engine')
 
     # Validate length
-    if length_max > (row_count ** 2):
-        length_max: int = row_count ** 2
-        print(f'Max length exceeds puzzle size, setting to {length_max} instead')
-
-    # Min cannot exceed max
-    length_min: int = length_max if length_min > length_max else length_min
-
-    # Get minimum search length by taking the minimum word and taking of the longest tile
-    puzzle_char_max_size: int = len(max(options.puzzle, key=len)) if options.puzzle else 1
-    length_search_min: int = length_min - puzzle_char_max_size + 1
-    length_search_min: int = 1 if length_search_min <= 1 else length_search_min
-
-    results: dict[str, Any] = {'puzzle': puzzle, 'filter': options.filter, 'contains': options.filter_contains, 'dictionary': options.dictionary.name}
+    letter_count: int = sum(len(tile) for row in puzzle for tile in row)
+    if (options.length or options.length_max or 0) > letter_count:
+        print(f'Max length exceeds letters on the puzzle, setting to {letter_count} instead')
 
     """
     Print Puzzle
@@ -183,65 +166,50 @@ def main() -> None:
     if printing:
         tile_size: int = len(max([y for x in puzzle for y in x], key=len)) + 1
         print('Puzzle: ')
-        print('=' * ((row_count * tile_size) - 1))
+        print('=' * ((column_count * tile_size) - 1))
         print('\n'.join([''.join([f'{item:^{tile_size}}' for item in row]) for row in puzzle]))
-        print('=' * ((row_count * tile_size) - 1))
-
-    """
-    Searching
-    """
-    # Setup a progressbar
-    bar_position: int = 0
-    bar_position_max: int = (row_count ** 2) * (length_max - length_search_min + 1)
-
-    # Loop through to find the words
-    words_valid: list[str] = []
-    for index_x in range(0, row_count):
-        for index_y in range(0, row_count):
-            x, y = (index_x, index_y)
-
-            for length in range(length_search_min, length_max + 1):
-                bar_position += 1
-                progressbar(bar_position, bar_position_max, puzzle[x][y].upper(), terminal_width)
-                # Call to find words starting from and ending at
-                get_words(x, y, length, puzzle[x][y], words_valid, [(x, y)], puzzle, tree_dictionary)
-    print()
-
-    search_time = time.time() - start_time
+        print('=' * ((column_count * tile_size) - 1))
 
     """
-    Sorting and filtering
+    Searching, sorting and filtering
     """
-    # Remove duplicates
-    words_valid: list[str] = sorted(set(words_valid), key=words_valid.index)
-    # Filter lengths
-    words_valid: list[str] = list(filter(lambda word_valid: length_min <= len(word_valid) <= length_max, words_valid))
-
-    # If a contains filter is used
-    if options.filter_contains:
-        if printing:
-            print(f'Filtering words with patterns "{", ".join(options.filter_contains)}"{" " * 80}')
-        results['contains'] = options.filter_contains
-        pattern_list = ['^.*'] + [f'(?=.*{x})' for x in options.filter_contains] + ['.*']
-        pattern2 = re.compile(''.join(pattern_list), re.IGNORECASE)
-        for word in words_valid[:]:
-            if not pattern2.fullmatch(word):
-                words_valid.remove(word)
-
-    # If a filter is used
-    if options.filter:
+    profile: cProfile.Profile | None = cProfile.Profile() if options.profile else None
+    if options.stream:
+        # Print each word as it is found, the results are what follows the words
         if printing:
-            print(f'Filtering with "{options.filter}" {" " * 80}')
-
-    if options.order_alpha:
-        words_valid.sort()
-    if options.order_size or options.order_size_r:
-        words_valid.sort(key=len, reverse=options.order_size_r)
+            print_filters()
+        solve: Callable[..., dict[str, Any]] = stream_words if profile is None else functools.partial(profile.runcall, stream_words)
+        results: dict[str, Any] = solve(solver.stream(puzzle,
+                                                      length=options.length, length_min=options.length_min,
+                                                      length_max=options.length_max,
+                                                      word_filter=options.filter, contains=options.filter_contains,
+                                                      instrument=options.instrument, topology=topology,
+                                                      time_budget=options.deadline, top=options.top),
+                                        options.json or options.pretty_json)
+    else:
+        solve: Callable[..., dict[str, Any]] = solver.solve if profile is None else functools.partial(profile.runcall, solver.solve)
+        results: dict[str, Any] = solve(puzzle,
+                                        length=options.length, length_min=options.length_min, length_max=options.length_max,
+                                        word_filter=options.filter, contains=options.filter_contains,
+                                        order_alpha=options.order_alpha, order_size=options.order_size,
+                                        order_size_r=options.order_size_r, instrument=options.instrument,
+                                        progress_width=terminal_width, topology=topology, time_budget=options.deadline,
+                                        top=options.top)
+        print()
+
+    if profile is not None:
+        if options.profile == '-':
+            pstats.Stats(profile, stream=sys.stderr).sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_LINES)
+        else:
+            profile.dump_stats(options.profile)
 
-    if printing:
-        print(f'Words found that are contained in "{options.dictionary.name}"{" " * 80}')
+    if printing and not options.stream:
+        print_filters()
 
-    results['words']: list[str] = words_valid
+    words_valid: list[str] = results.get('words', [])
+    length_min: int = results['stats']['length_min']
+    length_max: int = results['stats']['length_max']
+    search_time: float = results['stats']['search_time']
 
     # Get runtime
     total_time: float = time.time() - start_time
@@ -249,12 +217,8 @@ def main() -> None:
     """
     Display results
     """
-    results['stats']: dict[str, Any] = {'puzzle_size': row_count,
-                                        'word_count': len(words_valid),
-                                        'dictionary_load_time': dictionary_load_time,
-                                        'search_time': search_time - dictionary_load_time,
-                                        'time_per_word': 0.0 if len(words_valid) == 0 else (search_time - dictionary_load_time) / len(words_valid),
-                                        'total_time': total_time}
+    results['stats']['dictionary_load_time'] = dictionary_load_time
+    results['stats']['total_time'] = total_time
     if options.pretty_json:
         pprint.pp(results)
         return
@@ -263,23 +227,29 @@ def main() -> None:
         print(json.dumps(results))
         return
 
-    # Print words
-    if len(words_valid) > 0:
+    # Print words, unless already printed as they were found
+    # Mark words with the numbers of the dictionaries that have them, when searching several
+    words_shown: list[str] = words_valid
+    if 'word_sources' in results:
+        numbers: dict[str, int] = {name: number for number, name in enumerate(results['dictionaries'], 1)}
+        words_shown = [f'{word} {",".join(str(numbers[name]) for name in results["word_sources"][word])}'
+                       for word in words_valid]
+    if len(words_shown) > 0:
         if not options.list:
             divider: str = ' | '
 
-            column_width = len(max(words_valid, key=len)) + len(divider)
+            column_width = len(max(words_shown, key=len)) + len(divider)
             columns = int(((terminal_width - 1) - len(divider)) / column_width)
-            column_height = int(len(words_valid) / columns) + 1
+            column_height = int(len(words_shown) / columns) + 1
 
             words_valid_columned: list[Any] = []
             start, end = 0, 0
-            while end < len(words_valid):
+            while end < len(words_shown):
                 end: int = start + column_height
                 try:
-                    words_valid_columned.append(words_valid[start:end])
+                    words_valid_columned.append(words_shown[start:end])
                 except IndexError:
-                    words_valid_columned.append(words_valid[start:])
+                    words_valid_columned.append(words_shown[start:])
                 start = end
 
             for row in range(column_height):
@@ -291,19 +261,41 @@ def main() -> None:
                         break
                 print()
         else:
-            print('\n'.join(words_valid))
+            print('\n'.join(words_shown))
 
     # Print word count and stats
+    word_count: int = results['stats']['word_count']
+    if 'dictionaries' in results:
+        print('Dictionaries: ' + ', '.join(f'{number} {name}' for number, name in enumerate(results['dictionaries'], 1)))
     if length_min is length_max:
-        print(f'Found {len(words_valid)} words of {length_max} characters in length and matching filters')
+        print(f'Found {word_count} words of {length_max} characters in length and matching filters')
+    else:
+        print(f'Found {word_count} words between {length_min} and {length_max} characters in length and matching filters')
+    if results['stats']['score'] is None:
+        print(f'Top {word_count} words scoring {results["stats"]["top_score"]} points')
     else:
-        print(f'Found {len(words_valid)} words between {length_min} and {length_max} characters in length and matching filters')
+        print(f'Scoring {results["stats"]["score"]} points')
+    if results['stats']['partial']:
+        print(f'Stopped at the deadline, all words of {results["stats"]["complete_length"]} characters or more found, '
+              f'{results["stats"]["queued"]} paths left unexplored')
     print('--')
     print(f'Time to load dictionary   {dictionary_load_time:0.3f}s')
-    print(f'Time to search            {search_time - dictionary_load_time:0.3f}s')
-    print(f'Time to filter            {total_time - search_time:0.3f}s')
+    print(f'Time to search            {search_time:0.3f}s')
+    print(f'Time to filter            {total_time - search_time - dictionary_load_time:0.3f}s')
     print(f'Total:                    {total_time:0.3f}s')
 
+    if options.instrument:
+        instrumentation: dict[str, Any] = results['stats']['instrumentation']
+        print('--')
+        print(f'Nodes visited             {instrumentation["nodes_visited"]}')
+        print(f'Cut by the dictionary     {instrumentation["pruned_dictionary"]}')
+        print(f'Cut by the filters        {instrumentation["pruned_filter"]}')
+        print(f'Cut by length             {instrumentation["pruned_length"]}')
+        print(f'Duplicate words           {instrumentation["duplicates"]} of {instrumentation["words_found"]}')
+        slowest: list[dict[str, Any]] = sorted(instrumentation['tiles'], key=lambda tile: tile['time'], reverse=True)
+        print('Slowest tiles             ' + ', '.join(f'{tile["tile"].upper()}@{divmod(tile["cell"], column_count)} '
+                                                       f'{tile["time"]:0.3f}s' for tile in slowest[:5]))
+
     """
     Keyboard emulation
     """
@@ -341,6 +333,2033 @@ def main() -> None:
                 time.sleep(speed)
 
 
+def print_filters() -> None:
+    """
+    Print the filters being used and the dictionary being searched
+    :return: (void)
+    """
+    # If a contains filter is used
+    if options.filter_contains:
+        print(f'Filtering words with patterns "{", ".join(options.filter_contains)}"{" " * 80}')
+
+    # If a filter is used
+    if options.filter:
+        print(f'Filtering with "{options.filter}" {" " * 80}')
+
+    print(f'Words found that are contained in "{", ".join(file.name for file in options.dictionary)}"{" " * 80}')
+
+
+def stream_words(words: Iterator[str | dict[str, Any]], json_lines: bool = False,
+                 output: Any = sys.stdout) -> dict[str, Any]:
+    """
+    Print words as they are found, see Solver.stream
+    :param words: Words, then the results
+    :param json_lines: Print each word as a line of JSON
+    :param output: File to write the words to
+    :return: Results, without the words
+    """
+    for word in words:
+        if not isinstance(word, str):
+            return word
+        print(json.dumps({'word': word}) if json_lines else word, file=output, flush=True)
+
+
+def make_puzzle(tiles: list[str], size: int = 1, standard: bool = False, randomise: bool = False,
+                columns: int | None = None) -> list[list[str]]:
+    """
+    Make a puzzle from the tiles given, filling in missing tiles randomly
+    :param tiles: Tiles in order of appearance, a single string is split into letters
+    :param size: Puzzle size if randomly generated, ex: 4 is 4x4, or the number of rows with columns
+    :param standard: Roll the standard 16 dies instead
+    :param randomise: Randomise the order of the tiles given
+    :param columns: Lay the tiles out in rows of this many, default a square
+    :return: Puzzle matrix
+    """
+    if columns is not None and columns < 1:
+        raise ValueError('Columns must be at least 1')
+    if standard:
+        dies: dict[int, list[str]] = {
+            0: ['A', 'A', 'E', 'E', 'G', 'N'],
+            1: ['A', 'B', 'B', 'J', 'O', 'O'],
+            2: ['A', 'C', 'H', 'O', 'P', 'S'],
+            3: ['A', 'F', 'F', 'K', 'P', 'S'],
+            4: ['A', 'O', 'O', 'T', 'T', 'W'],
+            5: ['C', 'I', 'M', 'O', 'T', 'U'],
+            6: ['D', 'E', 'I', 'L', 'R', 'X'],
+            7: ['D', 'E', 'L', 'R', 'V', 'Y'],
+            8: ['D', 'I', 'S', 'T', 'T', 'Y'],
+            9: ['E', 'E', 'G', 'H', 'N', 'W'],
+            10: ['E', 'E', 'I', 'N', 'S', 'U'],
+            11: ['E', 'H', 'R', 'T', 'V', 'W'],
+            12: ['E', 'I', 'O', 'S', 'S', 'T'],
+            13: ['E', 'L', 'R', 'T', 'T', 'Y'],
+            14: ['H', 'I', 'M', 'N', 'U', 'Qu'],
+            15: ['H', 'L', 'N', 'N', 'R', 'Z'],
+        }
+
+        puzzle_letters: list[str] = []
+        while len(dies) > 0:
+            random_index = random.choice(list(dies.keys()))
+            popped_die = dies.pop(random_index)
+
+            puzzle_letter: str = random.choice(popped_die)
+            puzzle_letters.append(puzzle_letter)
+
+        puzzle: list[list[str]] = []
+        row_count: int = 4
+        random.shuffle(puzzle_letters)
+        for puzzle_x in range(0, row_count):
+            row: list[str] = []
+            for puzzle_y in range(0, row_count):
+                row.append(puzzle_letters[puzzle_x * row_count + puzzle_y].lower())
+            puzzle.append(row)
+        return puzzle
+
+    letters: list[str] = ['a', 'b', 'c', 'd', 'e', 'f', 'g',
+                          'h', 'i', 'j', 'k', 'l', 'm', 'n',
+                          'o', 'p', 'qu', 'r', 's', 't', 'u',
+                          'v', 'w', 'x', 'y', 'z']
+    # Weight the letters for the presence in the english language
+    weights: dict[str, float] = {
+        'a': 6.5, 'b': 1.2, 'c': 2.2, 'd': 3.4, 'e': 10,
+        'f': 1.7, 'g': 1.6, 'h': 4.8, 'i': 5.5, 'j': 0.2,
+        'k': 0.6, 'l': 3.1, 'm': 1.9, 'n': 5.3, 'o': 5.9,
+        'p': 1.5, 'q': 0.1, 'r': 4.7, 's': 6.3, 't': 7.2,
+        'u': 2.2, 'v': 0.8, 'w': 1.9, 'x': 0.2, 'y': 1.6, 'z': 0.3,
+    }
+
+    # Get size and generate missing tiles
+    puzzle_characters: list[str] = list(tiles[0]) if len(tiles) == 1 else list(tiles)
+    if columns:
+        size: int = max(size * columns, math.ceil(len(puzzle_characters) / columns) * columns)
+    else:
+        size: int = len(puzzle_characters) if len(tiles) > size ** 2 else size ** 2
+
+    generator_count: int = size - len(puzzle_characters)
+    puzzle_characters.extend(random.choices(letters, weights=[w[1] for w in weights.items()], k=generator_count))
+
+    puzzle_length: int = len(puzzle_characters)
+    row_count: int = int(math.sqrt(puzzle_length))
+    # Rows as wide as asked only need the last row filled in
+    if not columns and not math.sqrt(puzzle_length).is_integer():
+        row_count: int = math.ceil(math.sqrt(puzzle_length))
+        generator_count_square: int = (row_count**2) - len(puzzle_characters)
+        puzzle_characters.extend(random.choices(letters, weights=[w[1] for w in weights.items()], k=generator_count_square))
+        print(f'Extending puzzle letters by {generator_count_square} to make a puzzle', file=sys.stderr)
+
+    if randomise:
+        random.shuffle(puzzle_characters)
+
+    # Create a matrix of tiles
+    row_length: int = columns or row_count
+    puzzle: list[list[str]] = []
+    while puzzle_characters:
+        puzzle.append(puzzle_characters[0:row_length])
+        puzzle_characters = puzzle_characters[row_length:]
+    return puzzle
+
+
+def read_puzzle(puzzle: list[list[str]] | list[str] | str, topology: str | list[list[int]] = 'grid') -> list[list[str]]:
+    """
+    Get a puzzle matrix, rows are used as given, otherwise tiles are laid out like -p
+    :param puzzle: Puzzle matrix, or tiles in order of appearance laid out as by make_puzzle
+    :param topology: grid, torus or the neighbours of each cell, tiles given for neighbours are kept as a single row
+    :return: Puzzle matrix
+    """
+    if isinstance(puzzle, str):
+        puzzle = [puzzle]
+    if puzzle and not all(isinstance(row, list) for row in puzzle) and not isinstance(topology, str):
+        # A single string is split into letters, as by make_puzzle
+        tiles: list[str] = [str(tile) for tile in puzzle]
+        puzzle = [list(tiles[0]) if len(tiles) == 1 else tiles]
+    if not puzzle or not all(isinstance(row, list) for row in puzzle):
+        puzzle = make_puzzle([str(tile) for tile in puzzle])
+    elif not puzzle[0] or any(len(row) != len(puzzle[0]) for row in puzzle):
+        raise ValueError('Puzzle rows must be the same length')
+    return puzzle
+
+
+def word_lengths(puzzle: list[list[str]], length: int | None = None, length_min: int | None = 3,
+                 length_max: int | None = None) -> tuple[int, int, int]:
+    """
+    Get the lengths of words to find in a puzzle
+    :param puzzle: Puzzle matrix
+    :param length: Only a fixed length, overrides minimum and maximum
+    :param length_min: Minimum word length
+    :param length_max: Maximum word length, default letters on the puzzle or 32 whichever is less
+    :return: Minimum and maximum word length in characters, and minimum search length in tiles for the legacy engine
+    """
+    # Lengths are in letters, a tile of more than one letter adds them all
+    letter_count: int = sum(len(tile) for row in puzzle for tile in row)
+
+    # Set the max/min length of a word
+    length_max_word: int = min(letter_count, 32)
+    length_min_word: int = 3
+    if length:
+        length_min_word = length_max_word = length
+    else:
+        # Max word length of the letters on the puzzle or 32, whichever is smaller
+        if length_max:
+            length_max_word: int = length_max
+
+        if length_min:
+            length_min_word: int = length_min
+
+    # Validate length
+    if length_max_word > letter_count:
+        length_max_word: int = letter_count
+
+    # Min cannot exceed max
+    length_min_word: int = length_max_word if length_min_word > length_max_word else length_min_word
+
+    # Get minimum search length by taking the minimum word and taking of the longest tile, the legacy engine searches
+    # by length in tiles
+    puzzle_char_max_size: int = max(len(tile) for row in puzzle for tile in row)
+    length_search_min: int = length_min_word - puzzle_char_max_size + 1
+    length_search_min: int = 1 if length_search_min <= 1 else length_search_min
+    return length_min_word, length_max_word, length_search_min
+
+
+def check_engine(engine: str) -> None:
+    """
+    Check a search engine can be used
+    :param engine: Search engine, single, frontier or legacy
+    :return: (void)
+    """
+    if engine not in ('single', 'frontier', 'legacy'):
+        raise ValueError(f'Unknown engine: {engine}')
+    if engine == 'frontier' and np is None:
+        raise ValueError('The frontier engine needs NumPy, install numpy or use another engine')
+
+
+def score_word(word: str) -> int:
+    """
+    Get the points for a word, as scored in boggle
+    :param word: Word
+    :return: Points
+    """
+    return score_length(len(word))
+
+
+def score_length(length: int) -> int:
+    """
+    Get the points for a word of a length, as scored in boggle, qu counts as two letters
+    :param length: Letters in the word
+    :return: Points
+    """
+    return WORD_SCORES[min(length, len(WORD_SCORES) - 1)]
+
+
+def canonical_puzzle(puzzle: list[list[str]]) -> tuple[tuple[str, ...], ...]:
+    """
+    Get one form for a puzzle and its rotations and reflections, which all have the same words on a grid or torus
+    :param puzzle: Puzzle matrix
+    :return: Least of the 8 turned and flipped puzzles
+    """
+    rows: tuple[tuple[str, ...], ...] = tuple(tuple(row) for row in puzzle)
+    forms: list[tuple[tuple[str, ...], ...]] = []
+    for _ in range(4):
+        # Turn a quarter clockwise, then flip along the diagonal
+        rows = tuple(zip(*rows[::-1]))
+        forms.extend((rows, tuple(zip(*rows))))
+    return min(forms)
+
+
+class ResultCache:
+    """
+    Words of puzzles already solved, by the puzzle in canonical form, the dictionary's content and the options
+    The most recently used are kept in memory, and every one in a directory if given, shared by solvers and processes
+    """
+
+    def __init__(self, size: int = RESULT_CACHE_SIZE, directory: str | os.PathLike | None = None) -> None:
+        """
+        Start an empty cache
+        :param size: Number of results kept in memory, 0 for none
+        :param directory: Directory to keep results in as files, created if needed, None for memory only
+        """
+        self.size: int = size
+        self.directory: str | os.PathLike | None = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.results: collections.OrderedDict[str, tuple[list[list[str]], list[str]]] = collections.OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    @staticmethod
+    def key(puzzle: list[list[str]], dictionary: CompactDictionary, length_min: int, length_max: int,
+            word_filter: str | None, contains: list[str] | None, engine: str,
+            topology: str | list[list[int]] = 'grid') -> str:
+        """
+        Get the key of a search
+        :param puzzle: Puzzle matrix
+        :param dictionary: Dictionary searched, before pruning
+        :param length_min: Minimum word length, see word_lengths
+        :param length_max: Maximum word length, see word_lengths
+        :param word_filter: Regex words must match
+        :param contains: Patterns words must contain
+        :param engine: Search engine, the legacy engine matches the regex to the start of words
+        :param topology: grid, torus or the neighbours of each cell, only grids and tori are turned and flipped
+        :return: Key, a SHA-256 in hex
+        """
+        if isinstance(topology, str):
+            board: Any = [topology, canonical_puzzle(puzzle)]
+        else:
+            board: Any = [puzzle, board_neighbours(puzzle, topology)]
+        search: list[Any] = [board, dictionary.digest(), length_min, length_max, word_filter, contains, engine]
+        return hashlib.sha256(json.dumps(search).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> tuple[list[list[str]], list[str]] | None:
+        """
+        Get the words of a search, from memory or else the directory, counting hits and misses
+        :param key: Key of the search, see key
+        :return: Puzzle first solved and its words in the order found on it, or None if not cached
+        """
+        with self.lock:
+            entry: tuple[list[list[str]], list[str]] | None = self.results.get(key)
+            if entry is not None:
+                self.results.move_to_end(key)
+
+        if entry is None and self.directory is not None:
+            try:
+                with open(os.path.join(self.directory, f'{key}.json'), 'r') as file:
+                    content: dict[str, Any] = json.load(file)
+                entry = (content['puzzle'], content['words'])
+            except (OSError, ValueError, KeyError):
+                entry = None
+            if entry is not None:
+                self._keep(key, entry)
+
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if entry is None else (entry[0], list(entry[1]))
+
+    def put(self, key: str, puzzle: list[list[str]], words: list[str]) -> None:
+        """
+        Keep the words of a search
+        :param key: Key of the search, see key
+        :param puzzle: Puzzle solved, turned and flipped puzzles find the words in another order
+        :param words: Words found, in the order found
+        :return: (void)
+        """
+        entry: tuple[list[list[str]], list[str]] = ([list(row) for row in puzzle], list(words))
+        self._keep(key, entry)
+        if self.directory is None:
+            return
+        # Written aside then moved in, so other processes never read half a file
+        path: str = os.path.join(self.directory, f'{key}.json')
+        try:
+            with open(f'{path}.{os.getpid()}.{threading.get_ident()}.tmp', 'w') as file:
+                json.dump({'puzzle': entry[0], 'words': entry[1]}, file)
+            os.replace(file.name, path)
+        except OSError:
+            pass
+
+    def get_stats(self) -> dict[str, int]:
+        """
+        Get the counts of the cache
+        :return: Hits, misses and results in memory
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'results': len(self.results)}
+
+    def _keep(self, key: str, entry: tuple[list[list[str]], list[str]]) -> None:
+        """
+        Keep words in memory, dropping the least recently used past the size
+        :param key: Key of the search
+        :param entry: Puzzle solved and words found
+        :return: (void)
+        """
+        if not self.size:
+            return
+        with self.lock:
+            self.results[key] = entry
+            self.results.move_to_end(key)
+            while len(self.results) > self.size:
+                self.results.popitem(last=False)
+
+
+class Solver:
+    """
+    Solve puzzles against a dictionary loaded once
+    Holds no command line state, so it can be imported and used to solve many puzzles
+    """
+
+    def __init__(self, dictionary: CompactDictionary | str | os.PathLike | list[CompactDictionary | str | os.PathLike],
+                 engine: str = 'single', workers: int = 1, prune: bool = False,
+                 cache: ResultCache | None = None) -> None:
+        """
+        Load the dictionary to solve with
+        :param dictionary: Dictionary, or the path of a compact or pickled dictionary, or a list of them to search together
+        in one pass as a union, see CompactDictionary.union
+        :param engine: Default search engine, single, frontier or legacy
+        :param workers: Number of processes to spread the start tiles over, single engine only
+        :param prune: Search dictionaries pruned to the letters of each puzzle by default, see prune_dictionary
+        :param cache: Results to check before searching, can be shared with other solvers, None to always search
+        """
+        check_engine(engine)
+        if isinstance(dictionary, list):
+            dictionary = load_union(dictionary)
+        elif not isinstance(dictionary, CompactDictionary):
+            dictionary = load_dictionary(open(dictionary, 'rb'))
+        # The legacy engine walks a hierarchy of letters, expand it while loading
+        if engine == 'legacy':
+            dictionary.to_tree()
+
+        self.dictionary: CompactDictionary = dictionary
+        self.engine: str = engine
+        self.workers: int = workers
+        self.prune: bool = prune
+        self.cache: ResultCache | None = cache
+
+    def solve(self, puzzle: list[list[str]] | list[str] | str,
+              length: int | None = None, length_min: int | None = 3, length_max: int | None = None,
+              word_filter: str | None = None, contains: list[str] | str | None = None,
+              order_alpha: bool = False, order_size: bool = False, order_size_r: bool = False,
+              engine: str | None = None, prune: bool | None = None, instrument: bool = False,
+              progress_width: int | None = None, topology: str | list[list[int]] = 'grid',
+              time_budget: float | None = None, top: int | None = None) -> dict[str, Any]:
+        """
+        Find all the words in a puzzle, then sort them
+        :param puzzle: Puzzle matrix, or tiles in order of appearance laid out as by make_puzzle
+        :param length: Only a fixed length, overrides minimum and maximum
+        :param length_min: Minimum word length
+        :param length_max: Maximum word length, default letters on the puzzle or 32 whichever is less
+        :param word_filter: Regex words must fully match, case is ignored
+        :param contains: Patterns words must contain, in any order
+        :param order_alpha: Order alphabetically
+        :param order_size: Order by size ascending
+        :param order_size_r: Order by size descending
+        :param engine: Search engine, single, frontier or legacy, default the solver's
+        :param prune: Search a dictionary pruned to the letters of the puzzle, default the solver's
+        :param instrument: Add the counters of the search to the stats, branches cut by the dictionary, filters and
+        length, duplicate words and the time, nodes and words of each start tile
+        :param progress_width: Width of the progress bar, None for no progress bar
+        :param topology: grid, torus where the edges wrap around, or the neighbours of each cell numbered row by row
+        :param time_budget: Seconds to search for, longest words first, see search_best_first, None to find every word
+        :param top: Only the highest scoring words, highest first, see search_best_first, None for every word
+        :return: Results with the puzzle, options, words and stats
+        """
+        # Instrumented searches want the counters, and best first searches find the words longest first, so are never cached
+        cache: ResultCache | None = None if instrument or time_budget is not None or top is not None else self.cache
+        if cache is not None:
+            start_time: float = time.time()
+            puzzle = read_puzzle(puzzle, topology)
+            if isinstance(contains, str):
+                contains = [contains]
+            key: str = cache.key(puzzle, self.dictionary, *word_lengths(puzzle, length, length_min, length_max)[:2],
+                                 word_filter, contains, engine or self.engine, topology)
+            cached: tuple[list[list[str]], list[str]] | None = cache.get(key)
+            cache_stats: dict[str, Any] = {'hit': cached is not None, **cache.get_stats(), 'reordered': False}
+            if cached is not None and cached[0] != puzzle:
+                # Solved turned or flipped, find the words again on this puzzle for the order a search would give
+                words_cached: list[str] = self._search_order(puzzle, cached[1], length, length_min, length_max, engine,
+                                                             topology)
+                cache_stats['reordered'] = True
+            elif cached is not None:
+                words_cached: list[str] = cached[1]
+            cache_stats['lookup_time'] = time.time() - start_time
+
+        if cache is not None and cached is not None:
+            words_valid: list[str] = words_cached
+            trailer: dict[str, Any] = self._cached_results(puzzle, length, length_min, length_max, word_filter, contains,
+                                                           topology, words_valid)
+        else:
+            words_valid: list[str] = []
+            for item in self.stream(puzzle, length, length_min, length_max, word_filter, contains, engine, prune,
+                                    instrument, progress_width, topology, time_budget, top):
+                if isinstance(item, str):
+                    words_valid.append(item)
+                else:
+                    trailer: dict[str, Any] = item
+            if cache is not None:
+                cache.put(key, puzzle, words_valid)
+        if cache is not None:
+            trailer['stats']['cache'] = cache_stats
+
+        """
+        Sorting
+        """
+        start_time: float = time.time()
+        if order_alpha:
+            words_valid.sort()
+        if order_size or order_size_r:
+            words_valid.sort(key=len, reverse=order_size_r)
+
+        results: dict[str, Any] = {key: value for key, value in trailer.items() if key != 'stats'}
+        results['words']: list[str] = words_valid
+        results['stats']: dict[str, Any] = trailer['stats']
+        results['stats']['filter_time'] = time.time() - start_time
+        return results
+
+    def stream(self, puzzle: list[list[str]] | list[str] | str,
+               length: int | None = None, length_min: int | None = 3, length_max: int | None = None,
+               word_filter: str | None = None, contains: list[str] | str | None = None,
+               engine: str | None = None, prune: bool | None = None, instrument: bool = False,
+               progress_width: int | None = None, topology: str | list[list[int]] = 'grid',
+               time_budget: float | None = None, top: int | None = None) -> Iterator[str | dict[str, Any]]:
+        """
+        Find all the words in a puzzle, giving each word as soon as the tile it starts from has been searched
+        Words come once each, filtered, in the order they are found, only the words already given are kept
+        :param puzzle: Puzzle matrix, or tiles in order of appearance laid out as by make_puzzle
+        :param length: Only a fixed length, overrides minimum and maximum
+        :param length_min: Minimum word length
+        :param length_max: Maximum word length, default letters on the puzzle or 32 whichever is less
+        :param word_filter: Regex words must fully match, case is ignored
+        :param contains: Patterns words must contain, in any order
+        :param engine: Search engine, single, frontier or legacy, default the solver's
+        :param prune: Search a dictionary pruned to the letters of the puzzle, default the solver's
+        :param instrument: Add the counters of the search to the stats, see solve
+        :param progress_width: Width of the progress bar, None for no progress bar
+        :param topology: grid, torus or the neighbours of each cell, see solve
+        :param time_budget: Seconds to search for, longest words first whatever the engine, the words found so far are
+        given when it runs out, see search_best_first
+        :param top: Only the highest scoring words, given once all are found, highest first, see search_best_first
+        :return: Words, then a trailer with the puzzle, options and stats
+        """
+        dictionary: CompactDictionary = self.dictionary
+        workers: int = self.workers
+        engine: str = engine or self.engine
+        prune: bool = self.prune if prune is None else prune
+        check_engine(engine)
+
+        puzzle = read_puzzle(puzzle, topology)
+
+        if isinstance(contains, str):
+            contains = [contains]
+        for pattern in ([word_filter] if word_filter else []) + (contains or []):
+            try:
+                re.compile(pattern, re.IGNORECASE)
+            except re.error as err:
+                raise ValueError(f'Error in regex statement: {err.msg}')
+
+        # Only the legacy engine checks the edges of the puzzle as it goes, the others follow the neighbours of each cell
+        neighbours: tuple[tuple[int, ...], ...] = board_neighbours(puzzle, topology)
+        if engine == 'legacy' and (topology != 'grid' or len(puzzle) != len(puzzle[0])):
+            raise ValueError('The legacy engine only searches square grids')
+        # Searches within a time budget or for the top words go best first, whatever the engine
+        best_first: bool = time_budget is not None or top is not None
+        if best_first and engine == 'legacy':
+            raise ValueError('The legacy engine cannot search within a time budget or for the top words')
+        if time_budget is not None and time_budget <= 0:
+            raise ValueError('Time budget must be more than 0 seconds')
+        if top is not None and top < 1:
+            raise ValueError('Top must be at least 1 word')
+
+        start_time: float = time.time()
+        row_count: int = len(puzzle)
+        cell_count: int = len(neighbours)
+
+        length_min_word, length_max_word, length_search_min = word_lengths(puzzle, length, length_min, length_max)
+        # The legacy engine searches by length in tiles, no more than there are
+        length_search_max: int = min(length_max_word, cell_count)
+
+        results: dict[str, Any] = {'puzzle': puzzle, 'filter': word_filter, 'contains': contains, 'dictionary': dictionary.name,
+                                   'topology': topology}
+        # A union gives the dictionaries of each word, looked up once the word is found rather than during the search
+        word_sources: dict[str, list[str]] | None = None
+        if dictionary.sources:
+            results['dictionaries'] = dictionary.sources
+            word_sources = {}
+
+        """
+        Searching
+        """
+        # Setup a progressbar
+        bar_position: int = 0
+        if engine == 'legacy':
+            bar_position_max: int = cell_count * max(length_search_max - length_search_min + 1, 0)
+            tree_dictionary: dict[str, Any] = dictionary.to_tree()
+        else:
+            bar_position_max: int = cell_count
+
+        # The filters are followed during the search, the legacy engine checks the start of words as it goes
+        automaton: FilterAutomaton | None = FilterAutomaton.from_options(word_filter, contains) if engine != 'legacy' else None
+        # No need to search if the filters need letters not on the puzzle, or more letters than fit
+        searchable: bool = automaton is None or (automaton.start is not None
+                                                 and automaton.distance[automaton.start] <= length_max_word
+                                                 and automaton.possible(set(''.join(tile for row in puzzle for tile in row))))
+
+        # Lay the tiles out by cell, looking up the letters of each tile once
+        tiles: list[str] = [tile for row in puzzle for tile in row]
+        prune_time: float = time.time()
+        if prune and engine != 'legacy':
+            dictionary = prune_dictionary(dictionary, tuple(sorted(tiles)))
+        prune_time = time.time() - prune_time
+        tile_codes: list[tuple] = encode_tiles(dictionary, tiles)
+
+        # If a contains filter is used, the single engine has already checked during the search
+        contains_pattern: re.Pattern[str] | None = None
+        if contains and engine == 'legacy':
+            contains_pattern = re.compile(''.join(['^.*'] + [f'(?=.*{x})' for x in contains] + ['.*']), re.IGNORECASE)
+
+        # Loop through to find the words, keeping the counters of each start tile
+        tile_results: Iterator[tuple[list[str], dict[str, Any]]] = iter(())
+        pool: multiprocessing.pool.Pool | None = None
+        if not searchable:
+            pass
+        elif best_first:
+            # Words come as they are found rather than by tile, the counters of the whole search come last
+            tile_results = search_best_first(length_min_word, length_max_word, tiles, tile_codes, neighbours, dictionary,
+                                             automaton, None if time_budget is None else start_time + time_budget, top)
+            progress_width = None
+        elif engine == 'frontier':
+            tile_results = iter(search_frontier(length_min_word, length_max_word, tiles, tile_codes, neighbours, dictionary,
+                                                automaton))
+        elif engine == 'legacy':
+            tile_results = self._legacy_tiles(puzzle, tree_dictionary, length_search_min, length_search_max, word_filter,
+                                              bar_position_max, progress_width)
+            # The legacy engine moves the progress bar for each length
+            progress_width = None
+        elif workers > 1 and dictionary.name and len(tiles) > 1:
+            # Workers map the same dictionary file, results come back in tile order
+            pool = multiprocessing.Pool(min(workers, len(tiles)), tile_search_init,
+                                        (dictionary.name, puzzle, neighbours, length_min_word, length_max_word, word_filter,
+                                         contains, instrument))
+            tile_results = pool.imap(tile_search_worker, range(len(tiles)))
+        else:
+            tile_results = (search_tile(cell, length_min_word, length_max_word, tiles, tile_codes, neighbours,
+                                        dictionary, automaton, instrument) for cell in range(len(tiles)))
+
+        # Give each word once, keeping the first found, as soon as it passes the filters
+        words_seen: set[str] = set()
+        words_found: int = 0
+        word_count: int = 0
+        score: int = 0
+        first_word_time: float | None = None
+        tile_counters: list[dict[str, Any]] = []
+        try:
+            for tile, (words_tile, counters) in zip(itertools.repeat('') if best_first else tiles, tile_results):
+                bar_position += 1
+                if progress_width:
+                    progressbar(bar_position, bar_position_max, tile.upper(), progress_width)
+                if counters is not None:
+                    tile_counters.append(counters)
+                words_found += len(words_tile)
+                for word in words_tile:
+                    if word in words_seen:
+                        continue
+                    words_seen.add(word)
+                    if length_min_word <= len(word) <= length_max_word and (contains_pattern is None
+                                                                            or contains_pattern.fullmatch(word)):
+                        word_count += 1
+                        score += score_word(word)
+                        if word_sources is not None:
+                            word_sources[word] = self.dictionary.word_sources(word)
+                        if first_word_time is None:
+                            first_word_time = time.time() - start_time
+                        yield word
+        finally:
+            # Also stops the workers when the words are no longer wanted
+            if pool is not None:
+                pool.terminate()
+
+        search_time = time.time() - start_time - prune_time
+        nodes: int = sum(counters['nodes'] for counters in tile_counters)
+
+        results['stats']: dict[str, Any] = {'puzzle_size': row_count,
+                                            'word_count': word_count,
+                                            'score': score,
+                                            'length_min': length_min_word,
+                                            'length_max': length_max_word,
+                                            'search_time': search_time,
+                                            'time_per_word': 0.0 if word_count == 0 else search_time / word_count,
+                                            'nodes_visited': nodes,
+                                            'nodes_per_second': nodes / search_time if search_time else 0.0,
+                                            'first_word_time': first_word_time,
+                                            'prune_time': prune_time,
+                                            'filter_time': 0.0,
+                                            'partial': False}
+        if best_first:
+            search: dict[str, Any] = tile_counters[0] if tile_counters else {'coverage_max': 1.0, 'queued': 0,
+                                                                             'complete_length': length_min_word}
+            results['stats'].update({'time_budget': time_budget, 'top': top, 'partial': search.get('partial', False),
+                                     'coverage_max': search['coverage_max'], 'queued': search['queued'],
+                                     'complete_length': search['complete_length']})
+        if top is not None:
+            # Paths that cannot beat the top words are not searched, so the score of the whole puzzle is not known
+            results['stats'].update({'score': None, 'top_score': score})
+        if instrument:
+            # Cuts are only counted by the single engine
+            results['stats']['instrumentation'] = {
+                'nodes_visited': nodes,
+                'pruned_dictionary': sum(counters.get('dictionary', 0) for counters in tile_counters),
+                'pruned_filter': sum(counters.get('filter', 0) for counters in tile_counters),
+                'pruned_length': sum(counters.get('length', 0) for counters in tile_counters),
+                'words_found': words_found,
+                'duplicates': words_found - len(words_seen),
+                'tiles': [{'cell': cell, 'tile': tile, **counters} for cell, (tile, counters) in enumerate(zip(tiles, tile_counters))]
+                if not best_first else []}
+        if word_sources is not None:
+            results['word_sources'] = word_sources
+        yield results
+
+    def _search_order(self, puzzle: list[list[str]], words: list[str], length: int | None, length_min: int | None,
+                      length_max: int | None, engine: str | None, topology: str | list[list[int]]) -> list[str]:
+        """
+        Put the words of a puzzle in the order a search finds them, searching a dictionary of only those words
+        :param puzzle: Puzzle matrix
+        :param words: Words on the puzzle, ex: cached from a turned or flipped puzzle
+        :param length: Only a fixed length, overrides minimum and maximum
+        :param length_min: Minimum word length
+        :param length_max: Maximum word length
+        :param engine: Search engine, default the solver's
+        :param topology: grid, torus or the neighbours of each cell
+        :return: Words in the order found
+        """
+        if len(words) < 2:
+            return list(words)
+        dictionary: CompactDictionary = DictionaryBuilder().build((word, True) for word in sorted(words))
+        return [item for item in Solver(dictionary, engine or self.engine).stream(puzzle, length, length_min, length_max,
+                                                                                  topology=topology)
+                if isinstance(item, str)]
+
+    def _cached_results(self, puzzle: list[list[str]], length: int | None, length_min: int | None,
+                        length_max: int | None, word_filter: str | None, contains: list[str] | None,
+                        topology: str | list[list[int]], words: list[str]) -> dict[str, Any]:
+        """
+        Get the results of a search answered from the cache, as Solver.stream gives them after the words
+        :param puzzle: Puzzle matrix
+        :param length: Only a fixed length, overrides minimum and maximum
+        :param length_min: Minimum word length
+        :param length_max: Maximum word length
+        :param word_filter: Regex words must fully match
+        :param contains: Patterns words must contain
+        :param topology: grid, torus or the neighbours of each cell
+        :param words: Words given
+        :return: Puzzle, options and stats of no search
+        """
+        length_min_word, length_max_word, _ = word_lengths(puzzle, length, length_min, length_max)
+        sources: dict[str, Any] = {}
+        if self.dictionary.sources:
+            sources = {'dictionaries': self.dictionary.sources,
+                       'word_sources': {word: self.dictionary.word_sources(word) for word in words}}
+        return {'puzzle': puzzle, 'filter': word_filter, 'contains': contains, 'dictionary': self.dictionary.name,
+                'topology': topology, **sources,
+                'stats': {'puzzle_size': len(puzzle),
+                          'word_count': len(words),
+                          'score': sum(score_word(word) for word in words),
+                          'length_min': length_min_word,
+                          'length_max': length_max_word,
+                          'search_time': 0.0,
+                          'time_per_word': 0.0,
+                          'nodes_visited': 0,
+                          'nodes_per_second': 0.0,
+                          'first_word_time': None,
+                          'prune_time': 0.0,
+                          'filter_time': 0.0,
+                          'partial': False}}
+
+    def board(self, puzzle: list[list[str]] | list[str] | str,
+              length: int | None = None, length_min: int | None = 3, length_max: int | None = None,
+              topology: str | list[list[int]] = 'grid') -> 'IncrementalBoard':
+        """
+        Find all the words in a puzzle, keeping what is needed to find them again quickly after tiles change
+        :param puzzle: Puzzle matrix, or tiles in order of appearance laid out as by make_puzzle
+        :param length: Only a fixed length, overrides minimum and maximum
+        :param length_min: Minimum word length
+        :param length_max: Maximum word length, default letters on the puzzle or 32 whichever is less
+        :param topology: grid, torus or the neighbours of each cell, see solve
+        :return: Board, see IncrementalBoard
+        """
+        return IncrementalBoard(self.dictionary, puzzle, length, length_min, length_max, topology)
+
+    @staticmethod
+    def _legacy_tiles(puzzle: list[list[str]], tree_dictionary: dict[str, Any], length_min: int, length_max: int,
+                      word_filter: str | None, bar_position_max: int,
+                      progress_width: int | None) -> Iterator[tuple[list[str], dict[str, Any]]]:
+        """
+        Get the words starting from each tile with the legacy engine, searching once for each length
+        :param puzzle: Puzzle matrix
+        :param tree_dictionary: Hierarchy dictionary
+        :param length_min: Minimum length of words to find, in tiles
+        :param length_max: Maximum length of words to find, in tiles
+        :param word_filter: Regex the start of words must match
+        :param bar_position_max: Length of the progress bar
+        :param progress_width: Width of the progress bar, None for no progress bar
+        :return: Words found from each tile, may contain duplicates, and the counters of the search
+        """
+        bar_position: int = 0
+        row_count: int = len(puzzle)
+        for cell in range(row_count ** 2):
+            x, y = divmod(cell, row_count)
+            tile: str = puzzle[x][y]
+            words_tile: list[str] = []
+            counters: dict[str, Any] = {'nodes': 0, 'time': time.time()}
+            for length_search in range(length_min, length_max + 1):
+                bar_position += 1
+                if progress_width:
+                    progressbar(bar_position, bar_position_max, tile.upper(), progress_width)
+                # Call to find words starting from and ending at
+                counters['nodes'] += get_words(x, y, length_search, tile, words_tile, [(x, y)], puzzle, tree_dictionary,
+                                               word_filter)
+            counters['words'] = len(words_tile)
+            counters['time'] = time.time() - counters['time']
+            yield words_tile, counters
+
+
+class IncrementalBoard:
+    """
+    Words of a puzzle, kept up to date as tiles change, ex: when trying boards one or two tiles apart
+    Every path the dictionary can continue is kept by its cells, so a change drops the paths through the changed cells
+    and only searches on from the paths kept next to them
+    """
+
+    def __init__(self, dictionary: CompactDictionary, puzzle: list[list[str]] | list[str] | str,
+                 length: int | None = None, length_min: int | None = 3, length_max: int | None = None,
+                 topology: str | list[list[int]] = 'grid') -> None:
+        """
+        Find all the words in a puzzle
+        :param dictionary: Compact dictionary, not pruned, as tiles can change to any letters
+        :param puzzle: Puzzle matrix, or tiles in order of appearance laid out as by make_puzzle
+        :param length: Only a fixed length, overrides minimum and maximum
+        :param length_min: Minimum word length
+        :param length_max: Maximum word length, default letters on the puzzle or 32 whichever is less
+        :param topology: grid, torus or the neighbours of each cell, see Solver.solve
+        """
+        self.dictionary: CompactDictionary = dictionary
+        self.puzzle: list[list[str]] = [list(row) for row in read_puzzle(puzzle, topology)]
+        self.length: tuple[int | None, int | None, int | None] = (length, length_min, length_max)
+        self.length_min, self.length_max, _ = word_lengths(self.puzzle, *self.length)
+
+        self.tiles: list[str] = [tile for row in self.puzzle for tile in row]
+        self.tile_codes: list[tuple] = encode_tiles(dictionary, self.tiles)
+        self.neighbours: tuple[tuple[int, ...], ...] = board_neighbours(self.puzzle, topology)
+
+        # Dictionary node reached by each path, the paths ending at each cell and the paths spelling each word
+        self.paths: dict[tuple[int, ...], int] = {}
+        self.cell_paths: list[set[tuple[int, ...]]] = [set() for _ in self.tiles]
+        self.word_paths: collections.Counter[str] = collections.Counter()
+        self.score: int = 0
+        self.stats: dict[str, Any] = {}
+
+        start_time: float = time.time()
+        nodes: int = self._search(set(range(len(self.tiles))))
+        self._set_stats(start_time, nodes, 0)
+
+    def change(self, tiles: dict[int | tuple[int, int], str]) -> dict[str, Any]:
+        """
+        Change tiles and find the words again, searching only the paths through the changed cells
+        :param tiles: New tile by cell, numbered row by row, or by row and column
+        :return: Results, see results
+        """
+        start_time: float = time.time()
+        column_count: int = len(self.puzzle[0])
+        changed: dict[int, str] = {}
+        for position, tile in tiles.items():
+            cell: int = position[0] * column_count + position[1] if isinstance(position, tuple) else position
+            if not 0 <= cell < len(self.tiles) or (isinstance(position, tuple) and not 0 <= position[1] < column_count):
+                raise ValueError(f'No cell {position} on the puzzle')
+            if tile != self.tiles[cell]:
+                changed[cell] = tile
+
+        # Drop the paths ending at a changed cell and every path continuing them, while their letters are known
+        removed: int = 0
+        stack: list[tuple[int, ...]] = [path for cell in changed for path in self.cell_paths[cell]]
+        while stack:
+            path: tuple[int, ...] = stack.pop()
+            node: int | None = self.paths.pop(path, None)
+            if node is None:
+                continue
+            removed += 1
+            self.cell_paths[path[-1]].discard(path)
+            self._count(path, node, -1)
+            stack.extend(longer for neighbour in self.neighbours[path[-1]] if (longer := path + (neighbour,)) in self.paths)
+
+        for cell, tile in changed.items():
+            self.tiles[cell] = tile
+            self.tile_codes[cell] = self.dictionary.encode(tile)
+            self.puzzle[cell // column_count][cell % column_count] = tile
+
+        nodes: int = self._search(set(changed))
+        self._set_stats(start_time, nodes, removed)
+        return self.results()
+
+    def results(self) -> dict[str, Any]:
+        """
+        Get the words of the puzzle as it is now, the same words Solver.solve finds
+        :return: Results with the puzzle, words in alphabetical order, score and stats
+        """
+        return {'puzzle': [list(row) for row in self.puzzle],
+                'dictionary': self.dictionary.name,
+                'words': sorted(self.word_paths),
+                'score': self.score,
+                'stats': dict(self.stats)}
+
+    def _search(self, changed: set[int]) -> int:
+        """
+        Find the paths through changed cells, by the first changed cell they reach
+        Until then a path only passes unchanged cells, so is one of the paths kept
+        :param changed: Changed cells
+        :return: Number of nodes visited
+        """
+        dictionary: CompactDictionary = self.dictionary
+        paths: dict[tuple[int, ...], int] = self.paths
+        node_edges = dictionary.node_edges
+        starts: list[tuple[list[int], int]] = []
+        for cell in changed:
+            codes: tuple = self.tile_codes[cell]
+            node: int | None = dictionary.child(dictionary.ROOT, codes)
+            if node is not None:
+                starts.append(([cell], node))
+            for neighbour in self.neighbours[cell]:
+                if neighbour in changed:
+                    continue
+                for path in self.cell_paths[neighbour]:
+                    node = paths[path]
+                    if node_edges[node] and len(path) < self.length_max and (node := dictionary.child(node, codes)) is not None:
+                        starts.append(([*path, cell], node))
+
+        found: list[tuple[tuple[int, ...], int]] = []
+        nodes: int = 0
+        for cells, node in starts:
+            visited: int = 0
+            chars: int = 0
+            for cell in cells:
+                visited |= 1 << cell
+                chars += len(self.tiles[cell])
+            if chars <= self.length_max:
+                nodes += search_paths(cells[-1], node, visited, cells, chars, self.length_max, found, self.tiles,
+                                      self.tile_codes, self.neighbours, dictionary)
+
+        for path, node in found:
+            self.paths[path] = node
+            self.cell_paths[path[-1]].add(path)
+            self._count(path, node, 1)
+        return nodes
+
+    def _count(self, path: tuple[int, ...], node: int, paths: int) -> None:
+        """
+        Count a path if it spells a word long enough, keeping the score of the words found
+        :param path: Cells of the path
+        :param node: Dictionary node reached by the path
+        :param paths: 1 when added, -1 when removed
+        :return: (void)
+        """
+        if not self.dictionary.terminal(node):
+            return
+        word: str = ''.join(self.tiles[cell] for cell in path)
+        if not self.length_min <= len(word) <= self.length_max:
+            return
+
+        count: int = self.word_paths[word] + paths
+        if count and not self.word_paths[word]:
+            self.score += score_word(word)
+        elif not count:
+            self.score -= score_word(word)
+        if count:
+            self.word_paths[word] = count
+        else:
+            del self.word_paths[word]
+
+    def _set_stats(self, start_time: float, nodes: int, removed: int) -> None:
+        """
+        Keep the stats of the last search
+        :param start_time: When the search started
+        :param nodes: Nodes visited
+        :param removed: Paths dropped
+        :return: (void)
+        """
+        self.stats = {'puzzle_size': len(self.puzzle),
+                      'word_count': len(self.word_paths),
+                      'length_min': self.length_min,
+                      'length_max': self.length_max,
+                      'search_time': time.time() - start_time,
+                      'nodes_visited': nodes,
+                      'path_count': len(self.paths),
+                      'paths_removed': removed}
+
+
+def solve_request(request: dict[str, Any], solvers: dict[str, Solver],
+                  stream: bool = False) -> dict[str, Any] | Iterator[str | dict[str, Any]]:
+    """
+    Solve a puzzle described by a JSON request, as sent to the server
+    :param request: Puzzle and options, keys as in Solver.solve plus puzzle, size, columns, standard, randomise and
+    dictionary
+    :param solvers: Solvers by the name of their dictionary, the first is the default
+    :param stream: Give the words as they are found, see Solver.stream
+    :return: Results as built by Solver.solve, or words and then the results
+    """
+    if not isinstance(request, dict):
+        raise ValueError('Request must be a JSON object')
+
+    # Pick the dictionary by the name or path it was loaded with
+    name: str | None = request.get('dictionary')
+    if name is None:
+        solver: Solver = next(iter(solvers.values()))
+    elif name in solvers:
+        solver: Solver = solvers[name]
+    else:
+        raise ValueError(f'Dictionary not loaded: {name}')
+
+    # Rows are used as given, tiles for the neighbours of each cell are a single row, otherwise tiles are laid out like -p
+    tiles: list[Any] | str = request.get('puzzle', [])
+    topology: str | list[list[int]] = request.get('topology', 'grid')
+    if isinstance(tiles, str):
+        tiles = [tiles]
+    if tiles and all(isinstance(row, list) for row in tiles):
+        puzzle: list[list[str]] = [[str(tile) for tile in row] for row in tiles]
+    elif not isinstance(topology, str):
+        puzzle: list[list[str]] = read_puzzle([str(tile) for tile in tiles], topology)
+    else:
+        puzzle: list[list[str]] = make_puzzle([str(tile) for tile in tiles], int(request.get('size', 1)),
+                                              bool(request.get('standard', False)), bool(request.get('randomise', False)),
+                                              int(request['columns']) if request.get('columns') is not None else None)
+
+    if stream:
+        if any(request.get(key) for key in ('order_alpha', 'order_size', 'order_size_r')):
+            raise ValueError('Words cannot be ordered when streaming')
+        return solver.stream(puzzle,
+                             length=request.get('length'), length_min=request.get('length_min', 3),
+                             length_max=request.get('length_max'),
+                             word_filter=request.get('filter'), contains=request.get('contains'),
+                             engine=request.get('engine'), prune=request.get('prune'),
+                             instrument=bool(request.get('instrument', False)), topology=topology,
+                             time_budget=float(request['time_budget']) if request.get('time_budget') is not None else None,
+                             top=int(request['top']) if request.get('top') is not None else None)
+
+    return solver.solve(puzzle,
+                        length=request.get('length'), length_min=request.get('length_min', 3),
+                        length_max=request.get('length_max'),
+                        word_filter=request.get('filter'), contains=request.get('contains'),
+                        order_alpha=bool(request.get('order_alpha', False)), order_size=bool(request.get('order_size', False)),
+                        order_size_r=bool(request.get('order_size_r', False)), engine=request.get('engine'),
+                        prune=request.get('prune'), instrument=bool(request.get('instrument', False)), topology=topology,
+                        time_budget=float(request['time_budget']) if request.get('time_budget') is not None else None,
+                        top=int(request['top']) if request.get('top') is not None else None)
+
+
+class SolveRequestHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answer solve requests against the dictionaries loaded by the server
+    POST /solve with a JSON request, see solve_request, with "stream": true words are sent as JSON lines as they are found
+    GET /stats for request counts and latency
+    """
+
+    def do_GET(self) -> None:
+        if self.path.rstrip('/') != '/stats':
+            self.send_json({'error': 'Not found', 'detail': self.path}, 404)
+            return
+        self.send_json(self.server.get_stats())
+
+    def do_POST(self) -> None:
+        if self.path.rstrip('/') != '/solve':
+            self.send_json({'error': 'Not found', 'detail': self.path}, 404)
+            return
+
+        start_time: float = time.time()
+        try:
+            body: bytes = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            request: Any = json.loads(body or b'{}')
+            if isinstance(request, dict) and request.get('stream'):
+                # Start the search so a bad request is still answered with an error
+                search: Iterator[str | dict[str, Any]] = solve_request(request, self.server.solvers, stream=True)
+                first: str | dict[str, Any] = next(search)
+            else:
+                results: dict[str, Any] = solve_request(request, self.server.solvers)
+        except (ValueError, TypeError) as err:
+            self.server.add_request(time.time() - start_time, error=True)
+            self.send_json({'error': 'Invalid request', 'detail': str(err)}, 400)
+            return
+
+        if isinstance(request, dict) and request.get('stream'):
+            self.send_stream(search, first, start_time)
+            return
+
+        request_time: float = time.time() - start_time
+        self.server.add_request(request_time)
+        # Same stats as the command line, the dictionary is already loaded
+        results['stats']['dictionary_load_time'] = 0.0
+        results['stats']['total_time'] = request_time
+        self.send_json(results)
+
+    def send_json(self, content: dict[str, Any], status: int = 200) -> None:
+        """
+        Send a JSON response
+        :param content: Response content
+        :param status: HTTP status
+        :return: (void)
+        """
+        body: bytes = json.dumps(content).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_stream(self, search: Iterator[str | dict[str, Any]], first: str | dict[str, Any],
+                    start_time: float) -> None:
+        """
+        Send words as JSON lines as they are found, then the results
+        :param search: Words, then the results, see Solver.stream, closed when done
+        :param first: First word or results, taken from the search to check the request
+        :param start_time: Time the request was received
+        :return: (void)
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            for word in itertools.chain([first], search):
+                if isinstance(word, str):
+                    self.wfile.write(json.dumps({'word': word}).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+                    continue
+                request_time: float = time.time() - start_time
+                word['stats']['dictionary_load_time'] = 0.0
+                word['stats']['total_time'] = request_time
+                self.wfile.write(json.dumps(word).encode('utf-8') + b'\n')
+                self.server.add_request(request_time)
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.add_request(time.time() - start_time, error=True)
+        finally:
+            # Stop searching, ex: the client stopped reading, ending any workers
+            search.close()
+        self.close_connection = True
+
+    def address_string(self) -> str:
+        # Unix sockets have no client address
+        return self.client_address[0] if self.client_address else 'local'
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class SolveServerMixIn:
+    """
+    Shared state of the solve server, the solvers and the request stats
+    """
+
+    def setup_solver(self, solvers: dict[str, Solver], quiet: bool = False) -> None:
+        """
+        Set the solvers to answer requests with
+        :param solvers: Solvers by the name of their dictionary, the first is the default
+        :param quiet: Do not log requests
+        :return: (void)
+        """
+        self.solvers: dict[str, Solver] = solvers
+        self.quiet: bool = quiet
+        self.start_time: float = time.time()
+        self.stats_lock: threading.Lock = threading.Lock()
+        self.request_count: int = 0
+        self.error_count: int = 0
+        self.latencies: collections.deque[float] = collections.deque(maxlen=SERVE_LATENCY_HISTORY)
+
+    def add_request(self, latency: float, error: bool = False) -> None:
+        """
+        Record a request
+        :param latency: Time to answer the request
+        :param error: The request failed
+        :return: (void)
+        """
+        with self.stats_lock:
+            self.request_count += 1
+            self.error_count += error
+            self.latencies.append(latency)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        Get the server stats, latency is over the most recent requests
+        :return: Stats
+        """
+        with self.stats_lock:
+            latencies: list[float] = sorted(self.latencies)
+            stats: dict[str, Any] = {'uptime': time.time() - self.start_time,
+                                     'requests': self.request_count,
+                                     'errors': self.error_count,
+                                     'dictionaries': list(dict.fromkeys(solver.dictionary.name for solver in self.solvers.values()))}
+
+        cache: ResultCache | None = next(iter(self.solvers.values())).cache
+        if cache is not None:
+            stats['cache'] = cache.get_stats()
+
+        if latencies:
+            stats['latency'] = {'last': self.latencies[-1],
+                                'mean': statistics.fmean(latencies),
+                                'min': latencies[0],
+                                'p50': latencies[int(len(latencies) * 0.50)],
+                                'p90': latencies[int(len(latencies) * 0.90)],
+                                'p99': latencies[int(len(latencies) * 0.99)],
+                                'max': latencies[-1]}
+        return stats
+
+
+class SolveServer(SolveServerMixIn, http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class SolveUnixServer(SolveServerMixIn, socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def serve(address: str, dictionary_files: list[Any | list[Any]], quiet: bool = False,
+          cache: ResultCache | None = None) -> None:
+    """
+    Load the dictionaries once and answer solve requests until interrupted
+    :param address: host:port to listen on, or the path of a Unix socket
+    :param dictionary_files: Dictionaries opened in binary mode, or lists of them to search together, the first is the default
+    :param quiet: Do not log requests
+    :param cache: Results shared by the dictionaries, None to always search
+    :return: (void)
+    """
+    solvers: dict[str, Solver] = load_solvers(dictionary_files, cache)
+
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        server: SolveServer = SolveServer((host, int(port)), SolveRequestHandler)
+    elif hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        if os.path.exists(address):
+            os.remove(address)
+        server: SolveUnixServer = SolveUnixServer(address, SolveRequestHandler)
+    else:
+        print_error('Unix sockets are not supported on this platform', 'Use host:port instead')
+
+    server.setup_solver(solvers, quiet)
+    print(f'Serving {", ".join(server.get_stats()["dictionaries"])} on {address}', file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class FilterAutomaton:
+    """
+    Regex filters compiled to an automaton over letters, stepped along with the dictionary
+    Each regex is built from its parsed form as an NFA, states of the DFA are built as they are reached
+    A branch is cut as soon as a regex can no longer match, or the letters it still needs cannot fit
+    Constructs that cannot be followed letter by letter, ex: lookarounds and back references, match anything,
+    those filters still prune but words are checked against the regex itself
+    """
+
+    def __init__(self, patterns: list[str]) -> None:
+        """
+        Compile regex filters, words must match all of them
+        :param patterns: Regexes words must fully match, case is ignored
+        """
+        self.regexes: list[re.Pattern[str]] = [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
+        # Cleared if anything had to be approximated
+        self.exact: bool = True
+
+        # NFA, epsilon moves and letter moves of each state, with the start and end of each regex
+        self.epsilon: list[list[int]] = []
+        self.moves: list[list[tuple[Callable[[str], bool], int]]] = []
+        self.starts: list[int] = []
+        self.accepts_nfa: list[int] = []
+        for pattern in patterns:
+            self.starts.append(self._new_state())
+            self.accepts_nfa.append(self._build(sre_parse.parse(pattern, re.IGNORECASE), self.starts[-1]))
+        self.nfa_distance: list[float] = self._distances()
+
+        # DFA, built as states are reached
+        self.states: list[tuple[frozenset[int], ...]] = []
+        self.state_index: dict[tuple[frozenset[int], ...], int] = {}
+        self.accepting: list[bool] = []
+        # Fewest letters still needed to match every regex, by state
+        self.distance: list[float] = []
+        self.transitions: dict[tuple[int, str], int | None] = {}
+        self.start: int | None = self._dfa_state([{start} for start in self.starts])
+
+    @classmethod
+    def from_options(cls, word_filter: str | None = None,
+                     contains: list[str] | None = None) -> 'FilterAutomaton | None':
+        """
+        Compile the -f filter and -C patterns
+        :param word_filter: Regex words must fully match
+        :param contains: Patterns words must contain, in any order
+        :return: Automaton or None if there are no filters
+        """
+        patterns: list[str] = ([word_filter] if word_filter else []) + [f'.*(?:{pattern}).*' for pattern in contains or []]
+        return cls(patterns) if patterns else None
+
+    def step(self, state: int, letters: str) -> int | None:
+        """
+        Step from a state through letters
+        :param state: DFA state
+        :param letters: Letter(s), ex: a tile
+        :return: State reached or None if a regex can no longer match
+        """
+        try:
+            return self.transitions[state, letters]
+        except KeyError:
+            pass
+
+        next_state: int | None = state
+        for letter in letters:
+            next_state = self._dfa_state([{target for nfa_state in component for matcher, target in self.moves[nfa_state]
+                                           if matcher(letter)} for component in self.states[next_state]])
+            if next_state is None:
+                break
+        self.transitions[state, letters] = next_state
+        return next_state
+
+    def accepts(self, state: int, letters: list[str]) -> bool:
+        """
+        Does the word reaching a state match the regexes
+        :param state: DFA state
+        :param letters: Tiles of the word
+        :return: Match
+        """
+        if self.exact or not self.accepting[state]:
+            return self.accepting[state]
+        word: str = ''.join(letters)
+        return all(regex.fullmatch(word) for regex in self.regexes)
+
+    def possible(self, letters: set[str]) -> bool:
+        """
+        Can the regexes all be matched using only some letters, ex: those on the puzzle
+        :param letters: Letters available
+        :return: Possible
+        """
+        for start, accept in zip(self.starts, self.accepts_nfa):
+            reached: set[int] = {start}
+            pending: list[int] = [start]
+            while pending:
+                state: int = pending.pop()
+                targets: list[int] = self.epsilon[state] + [target for matcher, target in self.moves[state]
+                                                            if any(matcher(letter) for letter in letters)]
+                for target in targets:
+                    if target not in reached:
+                        reached.add(target)
+                        pending.append(target)
+            if accept not in reached:
+                return False
+        return True
+
+    def _new_state(self) -> int:
+        self.epsilon.append([])
+        self.moves.append([])
+        return len(self.epsilon) - 1
+
+    def _build(self, items: Any, state: int) -> int:
+        """
+        Add a sequence of parsed regex items to the NFA
+        :param items: Parsed regex
+        :param state: State the sequence starts from
+        :return: State the sequence ends at
+        """
+        for op, av in items:
+            state = self._build_item(op, av, state)
+        return state
+
+    def _build_item(self, op: Any, av: Any, state: int) -> int:
+        """
+        Add a parsed regex item to the NFA
+        :param op: Operation
+        :param av: Arguments of the operation
+        :param state: State the item starts from
+        :return: State the item ends at
+        """
+        constants = sre_parse
+        if op in (constants.LITERAL, constants.NOT_LITERAL, constants.ANY, constants.IN):
+            end: int = self._new_state()
+            self.moves[state].append((self._matcher(op, av), end))
+            return end
+
+        if op is constants.SUBPATTERN:
+            return self._build(av[-1], state)
+
+        if op is constants.BRANCH:
+            end: int = self._new_state()
+            for branch in av[1]:
+                branch_start: int = self._new_state()
+                self.epsilon[state].append(branch_start)
+                self.epsilon[self._build(branch, branch_start)].append(end)
+            return end
+
+        if op in (constants.MAX_REPEAT, constants.MIN_REPEAT, getattr(constants, 'POSSESSIVE_REPEAT', None)):
+            if op is not constants.MAX_REPEAT and op is not constants.MIN_REPEAT:
+                self.exact = False
+            repeat_min, repeat_max, item = av
+            for _ in range(repeat_min):
+                state = self._build(item, state)
+            if repeat_max is constants.MAXREPEAT:
+                loop: int = self._new_state()
+                self.epsilon[state].append(loop)
+                self.epsilon[self._build(item, loop)].append(loop)
+                return loop
+            end: int = self._new_state()
+            for _ in range(repeat_max - repeat_min):
+                self.epsilon[state].append(end)
+                state = self._build(item, state)
+            self.epsilon[state].append(end)
+            return end
+
+        if op is getattr(constants, 'ATOMIC_GROUP', None):
+            self.exact = False
+            return self._build(av, state)
+
+        if op is constants.AT and av in (constants.AT_BEGINNING, constants.AT_BEGINNING_STRING, constants.AT_END,
+                                         constants.AT_END_STRING):
+            # Start and end anchors, whole words are matched anyway
+            return state
+
+        # Cannot be followed letter by letter, zero width checks match nothing, everything else matches anything
+        self.exact = False
+        if op in (constants.ASSERT, constants.ASSERT_NOT, constants.AT):
+            return state
+        loop: int = self._new_state()
+        self.epsilon[state].append(loop)
+        self.moves[loop].append((lambda letter: True, loop))
+        return loop
+
+    @staticmethod
+    def _matcher(op: Any, av: Any) -> Callable[[str], bool]:
+        """
+        Make a test for a letter, ignoring case
+        :param op: LITERAL, NOT_LITERAL, ANY or IN
+        :param av: Arguments of the operation
+        :return: Test
+        """
+        constants = sre_parse
+        if op is constants.ANY:
+            return lambda letter: letter != '\n'
+        if op is constants.LITERAL:
+            character: str = chr(av).lower()
+            return lambda letter: letter.lower() == character
+        if op is constants.NOT_LITERAL:
+            character: str = chr(av).lower()
+            return lambda letter: letter.lower() != character
+
+        categories: dict[Any, Callable[[str], bool]] = {
+            constants.CATEGORY_DIGIT: str.isdigit,
+            constants.CATEGORY_NOT_DIGIT: lambda letter: not letter.isdigit(),
+            constants.CATEGORY_SPACE: str.isspace,
+            constants.CATEGORY_NOT_SPACE: lambda letter: not letter.isspace(),
+            constants.CATEGORY_WORD: lambda letter: letter.isalnum() or letter == '_',
+            constants.CATEGORY_NOT_WORD: lambda letter: not (letter.isalnum() or letter == '_'),
+        }
+        negate: bool = False
+        tests: list[Callable[[str], bool]] = []
+        for item_op, item_av in av:
+            if item_op is constants.NEGATE:
+                negate = True
+            elif item_op is constants.LITERAL:
+                tests.append(lambda letter, character=chr(item_av): letter == character)
+            elif item_op is constants.RANGE:
+                tests.append(lambda letter, low=item_av[0], high=item_av[1]: low <= ord(letter) <= high)
+            elif item_op is constants.CATEGORY:
+                tests.append(categories.get(item_av, lambda letter: True))
+
+        def matcher(letter: str) -> bool:
+            found: bool = any(test(case) for case in {letter, letter.lower(), letter.upper()} for test in tests)
+            return found is not negate
+
+        return matcher
+
+    def _distances(self) -> list[float]:
+        """
+        Find the fewest letters from each NFA state to the end of its regex
+        :return: Distance of each state, infinite if the end cannot be reached
+        """
+        reverse: list[list[tuple[int, int]]] = [[] for _ in self.epsilon]
+        for state in range(len(self.epsilon)):
+            for target in self.epsilon[state]:
+                reverse[target].append((state, 0))
+            for _, target in self.moves[state]:
+                reverse[target].append((state, 1))
+
+        # Breadth first back from the ends, epsilon moves cost nothing
+        distance: list[float] = [math.inf] * len(self.epsilon)
+        pending: collections.deque[int] = collections.deque(self.accepts_nfa)
+        for accept in self.accepts_nfa:
+            distance[accept] = 0
+        while pending:
+            target: int = pending.popleft()
+            for state, cost in reverse[target]:
+                if distance[target] + cost < distance[state]:
+                    distance[state] = distance[target] + cost
+                    if cost:
+                        pending.append(state)
+                    else:
+                        pending.appendleft(state)
+        return distance
+
+    def _dfa_state(self, components: list[set[int]]) -> int | None:
+        """
+        Get the DFA state for the NFA states reached in each regex, following epsilon moves
+        :param components: NFA states of each regex
+        :return: DFA state or None if a regex cannot be matched
+        """
+        key: list[frozenset[int]] = []
+        for nfa_states in components:
+            closure: set[int] = set(nfa_states)
+            pending: list[int] = list(nfa_states)
+            while pending:
+                for target in self.epsilon[pending.pop()]:
+                    if target not in closure:
+                        closure.add(target)
+                        pending.append(target)
+            live: frozenset[int] = frozenset(state for state in closure if self.nfa_distance[state] < math.inf)
+            if not live:
+                return None
+            key.append(live)
+
+        key: tuple[frozenset[int], ...] = tuple(key)
+        if key not in self.state_index:
+            self.state_index[key] = len(self.states)
+            self.states.append(key)
+            self.accepting.append(all(accept in component for accept, component in zip(self.accepts_nfa, key)))
+            self.distance.append(max([min(self.nfa_distance[state] for state in component) for component in key], default=0))
+        return self.state_index[key]
+
+
+@functools.lru_cache(maxsize=PRUNE_CACHE_SIZE)
+def prune_dictionary(dictionary: CompactDictionary, tiles: tuple[str, ...]) -> CompactDictionary:
+    """
+    Get a dictionary of only the words that can be spelt from the letters of a puzzle's tiles
+    Worth it when the same tiles come up again, ex: moving tiles around, building it costs more than one search saves
+    Note: Cached, by the sorted tiles
+    :param dictionary: Compact dictionary
+    :param tiles: Sorted tiles of the puzzle
+    :return: Pruned dictionary, with the same name and letter codes
+    """
+    pruned: CompactDictionary = dictionary.restrict(''.join(tiles))
+    pruned.name = dictionary.name
+    return pruned
+
+
+def encode_tiles(dictionary: CompactDictionary, tiles: list[str]) -> list[tuple]:
+    """
+    Get the letter codes of each cell, looking up each distinct tile once
+    :param dictionary: Compact dictionary
+    :param tiles: Tile of each cell
+    :return: Letter codes of each cell, see CompactDictionary.encode
+    """
+    codes: dict[str, tuple] = {tile: dictionary.encode(tile) for tile in set(tiles)}
+    return [codes[tile] for tile in tiles]
+
+
+@functools.lru_cache
+def neighbour_table(row_count: int, column_count: int | None = None, wrap: bool = False) -> tuple[tuple[int, ...], ...]:
+    """
+    Get the neighbours of each cell of a grid, cells are numbered row by row
+    Note: Cached, built once per puzzle size
+    :param row_count: Number of rows
+    :param column_count: Number of columns, default the number of rows
+    :param wrap: Edges wrap around to the other side, ex: a torus
+    :return: Neighbouring cells of each cell, in order
+    """
+    column_count = column_count or row_count
+    neighbours: list[tuple[int, ...]] = []
+    for x in range(row_count):
+        for y in range(column_count):
+            cells: set[int] = set()
+            for pos_x in (-1, 0, 1):
+                for pos_y in (-1, 0, 1):
+                    row, column = x + pos_x, y + pos_y
+                    if wrap:
+                        row, column = row % row_count, column % column_count
+                    elif not (0 <= row < row_count and 0 <= column < column_count):
+                        continue
+                    cells.add(row * column_count + column)
+            # Small wrapped grids reach the same cell more than one way, or back to the cell itself
+            cells.discard(x * column_count + y)
+            neighbours.append(tuple(sorted(cells)))
+    return tuple(neighbours)
+
+
+def board_neighbours(puzzle: list[list[str]], topology: str | list[list[int]] = 'grid') -> tuple[tuple[int, ...], ...]:
+    """
+    Get the neighbours of each cell of a puzzle, built once before the search so no step checks the edges
+    :param puzzle: Puzzle matrix, cells are numbered row by row
+    :param topology: grid, torus where the edges wrap around, or the neighbours of each cell
+    :return: Neighbouring cells of each cell, in order
+    """
+    cell_count: int = sum(len(row) for row in puzzle)
+    if topology == 'grid':
+        return neighbour_table(len(puzzle), len(puzzle[0]))
+    if topology == 'torus':
+        return neighbour_table(len(puzzle), len(puzzle[0]), True)
+    if isinstance(topology, str) or len(topology) != cell_count:
+        raise ValueError(f'Topology must be grid, torus or the neighbours of each of the {cell_count} cells')
+
+    neighbours: list[tuple[int, ...]] = []
+    for cell, cells in enumerate(topology):
+        if not all(isinstance(neighbour, int) and 0 <= neighbour < cell_count and neighbour != cell for neighbour in cells):
+            raise ValueError(f'Neighbours of cell {cell} must be other cells, numbered from 0 to {cell_count - 1}')
+        neighbours.append(tuple(sorted(set(cells))))
+    return tuple(neighbours)
+
+
+def length_window(dictionary: CompactDictionary, length_min: int, length_max: int) -> bool:
+    """
+    Are the lengths narrow enough for the words through each node to cut paths, ex: -l 8
+    Checking costs more than it saves when only the shortest words are left out, as by default
+    :param dictionary: Compact dictionary
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :return: Cut by the words through each node, see CompactDictionary.node_shortest and node_longest
+    """
+    return length_min > 3 or length_max < dictionary.node_longest[dictionary.ROOT]
+
+
+def word_fits(dictionary: CompactDictionary, node: int, chars: int, length_min: int, length_max: int) -> bool:
+    """
+    Can a word through a node be between two lengths
+    :param dictionary: Compact dictionary
+    :param node: Dictionary node reached
+    :param chars: Length of the path to the node, in characters
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :return: Fits
+    """
+    return chars + dictionary.node_shortest[node] <= length_max and chars + dictionary.node_longest[node] >= length_min
+
+
+def search_tile(cell: int, length_min: int, length_max: int, tiles: list[str], tile_codes: list[tuple],
+                neighbours: tuple[tuple[int, ...], ...], dictionary: CompactDictionary,
+                automaton: FilterAutomaton | None = None, instrument: bool = False) -> tuple[list[str], dict[str, Any]]:
+    """
+    Get all the words starting from a tile, in the order the per length search finds them
+    :param cell: Cell of the tile
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :param tiles: Tile of each cell
+    :param tile_codes: Letter codes of each cell, see CompactDictionary.encode
+    :param neighbours: Neighbouring cells of each cell, see board_neighbours
+    :param dictionary: Compact dictionary
+    :param automaton: Filters words must match, None for no filters
+    :param instrument: Count the branches cut, counting slows the search
+    :return: Words found, may contain duplicates, and the counters of the search, see Solver.solve
+    """
+    start_time: float = time.time()
+    # Walk every path from the tile once, collecting words of all lengths, by their length in tiles
+    words_by_length: collections.defaultdict[int, list[str]] = collections.defaultdict(list)
+    counters: dict[str, Any] = {'nodes': 0, 'dictionary': 0, 'filter': 0, 'length': 0}
+    state: int | None = 0
+    if automaton is not None:
+        state = automaton.step(automaton.start, tiles[cell]) if automaton.start is not None else None
+    node: int | None = dictionary.child(dictionary.ROOT, tile_codes[cell])
+    if node is None:
+        counters['dictionary'] += 1
+    elif state is None:
+        counters['filter'] += 1
+    elif not word_fits(dictionary, node, len(tiles[cell]), length_min, length_max):
+        counters['length'] += 1
+    else:
+        counters['nodes'] = search_words(cell, node, 1 << cell, 1, len(tiles[cell]), length_min, length_max, [tiles[cell]],
+                                         words_by_length, counters if instrument else None, tiles, tile_codes, neighbours,
+                                         dictionary, automaton, state, length_window(dictionary, length_min, length_max))
+    # Keep the order the per length search would have found them in
+    words: list[str] = [word for length in sorted(words_by_length) for word in words_by_length[length]]
+    counters['words'] = len(words)
+    counters['time'] = time.time() - start_time
+    return words, counters
+
+
+@functools.lru_cache(maxsize=PRUNE_CACHE_SIZE)
+def frontier_tables(dictionary: CompactDictionary) -> tuple[Any, Any, Any, Any, Any]:
+    """
+    Get the edges of a dictionary as arrays, for the frontier engine to step many paths at once
+    Note: Cached, by dictionary
+    :param dictionary: Compact dictionary
+    :return: Edge keys in order, node << 8 | letter code, the node each edge leads to, the nodes that end words, and the
+    shortest and longest words through each node
+    """
+    node_first = np.asarray(dictionary.node_first, dtype=np.int64)
+    node_edges = np.asarray(dictionary.node_edges, dtype=np.int64)
+    # Edges are stored together by node, but not always in the order of the nodes
+    owners = np.repeat(np.arange(dictionary.node_count, dtype=np.int64), node_edges)
+    edges = np.repeat(node_first - np.cumsum(node_edges) + node_edges, node_edges) + np.arange(dictionary.edge_count)
+    keys = np.empty(dictionary.edge_count, dtype=np.int64)
+    keys[edges] = owners << 8
+    keys |= np.frombuffer(dictionary.buffer, np.uint8, dictionary.edge_count, dictionary.letters_offset)
+
+    order = np.argsort(keys)
+    return (keys[order], np.asarray(dictionary.edge_nodes, dtype=np.int64)[order],
+            np.asarray(dictionary.node_flags, dtype=np.uint8) & FLAG_WORD != 0,
+            np.asarray(dictionary.node_shortest, dtype=np.int64), np.asarray(dictionary.node_longest, dtype=np.int64))
+
+
+def frontier_step(nodes: Any, cells: Any, codes: Any, keys: Any, children: Any) -> Any:
+    """
+    Step paths through the tiles of the cells they move to, all at once
+    :param nodes: Dictionary node reached by each path
+    :param cells: Cell each path moves to
+    :param codes: Letter codes of each cell, -1 past the end of shorter tiles
+    :param keys: Edge keys in order, see frontier_tables
+    :param children: Node each edge leads to, see frontier_tables
+    :return: Node reached by each path, -1 where no word continues
+    """
+    for column in range(codes.shape[1]):
+        code = codes[cells, column]
+        wanted = nodes << 8 | np.maximum(code, 0)
+        index = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+        found = (keys[index] == wanted) & (nodes >= 0)
+        nodes = np.where(code < 0, nodes, np.where(found, children[index], -1))
+    return nodes
+
+
+def search_frontier(length_min: int, length_max: int, tiles: list[str], tile_codes: list[tuple],
+                    neighbours: tuple[tuple[int, ...], ...], dictionary: CompactDictionary,
+                    automaton: FilterAutomaton | None = None) -> list[tuple[list[str], dict[str, Any]]]:
+    """
+    Get all the words starting from each tile, stepping every path from every tile one tile at a time
+    The paths of a length are held as arrays of dictionary nodes, cells and used cells, and moved on together
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :param tiles: Tile of each cell
+    :param tile_codes: Letter codes of each cell, see CompactDictionary.encode
+    :param neighbours: Neighbouring cells of each cell, see board_neighbours
+    :param dictionary: Compact dictionary
+    :param automaton: Filters words must match, checked on the words found, None for no filters
+    :return: Words found from each tile, in the order search_tile finds them, and the counters of the search
+    """
+    keys, children, terminal, shortest, longest = frontier_tables(dictionary)
+    window: bool = length_window(dictionary, length_min, length_max)
+    cell_count: int = len(tiles)
+    codes = np.full((cell_count, max(len(codes) for codes in tile_codes)), -1, dtype=np.int64)
+    for cell, cell_codes in enumerate(tile_codes):
+        codes[cell, :len(cell_codes)] = [code[0] for code in cell_codes]
+    adjacency = np.full((cell_count, max(len(cells) for cells in neighbours)), -1, dtype=np.int64)
+    for cell, cells in enumerate(neighbours):
+        adjacency[cell, :len(cells)] = cells
+
+    tile_chars = np.array([len(tile) for tile in tiles], dtype=np.int64)
+
+    # The first tile of every path, used cells are a bitmask split into 64 cell words
+    cells = np.arange(cell_count, dtype=np.int64)
+    nodes = frontier_step(np.full(cell_count, dictionary.ROOT, dtype=np.int64), cells, codes, keys, children)
+    kept = nodes >= 0
+    kept[kept] = ((tile_chars[kept] + shortest[nodes[kept]] <= length_max)
+                  & (tile_chars[kept] + longest[nodes[kept]] >= length_min))
+    cells, nodes = cells[kept], nodes[kept]
+    chars = tile_chars[cells]
+    visited = np.zeros((len(cells), (cell_count + 63) // 64), dtype=np.uint64)
+    visited[np.arange(len(cells)), cells >> 6] = np.left_shift(np.uint64(1), (cells & 63).astype(np.uint64))
+    # Cells and the path before of each length, to spell the words found
+    path_cells: list[Any] = [cells]
+    path_parents: list[Any] = [np.full(len(cells), -1, dtype=np.int64)]
+    starts = cells
+    node_counts = np.bincount(starts, minlength=cell_count)
+    words_tile: list[list[str]] = [[] for _ in range(cell_count)]
+
+    for length in itertools.count(1):
+        if not len(nodes):
+            break
+        rows = np.flatnonzero(terminal[nodes] & (chars >= length_min))
+        path = np.empty((len(rows), length), dtype=np.int64)
+        for position in range(length - 1, -1, -1):
+            path[:, position] = path_cells[position][rows]
+            rows = path_parents[position][rows]
+        # Neighbours are in order of cell, so in order of cells is the order the recursive search finds them
+        for row in path[np.lexsort(path.T[::-1])].tolist():
+            letters: list[str] = [tiles[cell] for cell in row]
+            if automaton is not None:
+                state: int | None = automaton.start
+                for tile in letters:
+                    state = automaton.step(state, tile)
+                    if state is None:
+                        break
+                if state is None or not automaton.accepts(state, letters):
+                    continue
+            words_tile[row[0]].append(''.join(letters))
+
+        # Move every path to every neighbour not used yet, whose tile still fits
+        parents = np.repeat(np.arange(len(nodes)), adjacency.shape[1])
+        moves = adjacency[cells].ravel()
+        parents, moves = parents[moves >= 0], moves[moves >= 0]
+        fits = chars[parents] + tile_chars[moves] <= length_max
+        parents, moves = parents[fits], moves[fits]
+        words, bits = moves >> 6, np.left_shift(np.uint64(1), (moves & 63).astype(np.uint64))
+        free = visited[parents, words] & bits == 0
+        parents, moves, words, bits = parents[free], moves[free], words[free], bits[free]
+
+        moved = frontier_step(nodes[parents], moves, codes, keys, children)
+        kept = moved >= 0
+        if window:
+            # No word through the node fits the lengths
+            reached = chars[parents[kept]] + tile_chars[moves[kept]]
+            kept[kept] = (reached + shortest[moved[kept]] <= length_max) & (reached + longest[moved[kept]] >= length_min)
+        parents, cells, nodes = parents[kept], moves[kept], moved[kept]
+        chars = chars[parents] + tile_chars[cells]
+        visited = visited[parents]
+        visited[np.arange(len(parents)), words[kept]] |= bits[kept]
+        starts = starts[parents]
+        path_cells.append(cells)
+        path_parents.append(parents)
+        node_counts += np.bincount(starts, minlength=cell_count)
+
+    # Every tile is searched at once, so no time is given to each
+    return [(words, {'nodes': int(node_count), 'words': len(words), 'time': 0.0})
+            for words, node_count in zip(words_tile, node_counts.tolist())]
+
+
+def search_best_first(length_min: int, length_max: int, tiles: list[str], tile_codes: list[tuple],
+                      neighbours: tuple[tuple[int, ...], ...], dictionary: CompactDictionary,
+                      automaton: FilterAutomaton | None = None, deadline: float | None = None,
+                      top: int | None = None) -> Iterator[tuple[list[str], dict[str, Any] | None]]:
+    """
+    Get the words of a puzzle, longest first, stopping at a deadline with the best words found so far
+    Paths are taken from a heap by the longest word they can still make, see CompactDictionary.node_longest, so when a
+    word is found every word longer than what the other paths can make has been found. Longer words score more, so they
+    are also the highest scoring first
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :param tiles: Tile of each cell
+    :param tile_codes: Letter codes of each cell, see CompactDictionary.encode
+    :param neighbours: Neighbouring cells of each cell, see board_neighbours
+    :param dictionary: Compact dictionary
+    :param automaton: Filters words must match, None for no filters
+    :param deadline: Time to stop searching at, as time.time(), None to search every path
+    :param top: Only the highest scoring words, given once the search is done, ties kept in the order found. Paths that
+    cannot score more than the lowest of the best words so far are not searched. None for every word
+    :return: Each word as it is found, may contain duplicates, then the counters of the search, with partial if stopped,
+    queued, the paths left unexplored, coverage_max, the most of the search that can have been done, and complete_length,
+    the length from which every word has been found
+    """
+    start_time: float = time.time()
+    node_shortest, node_longest = dictionary.node_shortest, dictionary.node_longest
+    counters: dict[str, Any] = {'nodes': 0, 'words': 0}
+
+    # Longest word first, then the longest path, so paths run on to their words rather than fanning out
+    paths: list[tuple[int, int, int, int, int, int, int, tuple[str, ...]]] = []
+    order: Iterator[int] = itertools.count()
+
+    def push(cell: int, node: int, visited: int, chars: int, state: int | None, letters: tuple[str, ...]) -> None:
+        # Queue a path by the longest word it can still make, unless none fits or the filters cannot match
+        longest: int = node_longest[node]
+        if longest == NO_WORD or chars + longest < length_min or chars + node_shortest[node] > length_max or state is None:
+            return
+        if automaton is not None and chars + automaton.distance[state] > length_max:
+            return
+        heapq.heappush(paths, (-min(chars + longest, length_max), -chars, next(order), cell, node, visited, state, letters))
+
+    tile_chars: list[int] = [len(tile) for tile in tiles]
+    for cell, tile in enumerate(tiles):
+        node: int | None = dictionary.child(dictionary.ROOT, tile_codes[cell])
+        if node is not None and tile_chars[cell] <= length_max:
+            state: int | None = 0 if automaton is None else (
+                automaton.step(automaton.start, tile) if automaton.start is not None else None)
+            push(cell, node, 1 << cell, tile_chars[cell], state, (tile,))
+
+    # Top words so far by score and the order found, lowest and last found first
+    best: list[tuple[int, int, str]] = []
+    words_seen: set[str] = set()
+
+    nodes: int = 0
+    while paths:
+        # Checking the time costs more than a step, so only check every so often
+        if deadline is not None and nodes & 255 == 0 and time.time() >= deadline:
+            break
+        # No path left can make a word scoring more than the lowest of the top words
+        if top is not None and len(best) == top and score_length(-paths[0][0]) <= best[0][0]:
+            break
+        _, negative_chars, _, cell, node, visited, state, letters = heapq.heappop(paths)
+        chars: int = -negative_chars
+        nodes += 1
+        if chars >= length_min and dictionary.terminal(node) and (automaton is None or automaton.accepts(state, letters)):
+            counters['words'] += 1
+            word: str = ''.join(letters)
+            if top is None:
+                yield [word], None
+            elif word not in words_seen:
+                words_seen.add(word)
+                heapq.heappush(best, (score_word(word), -len(words_seen), word))
+                if len(best) > top:
+                    heapq.heappop(best)
+        if chars >= length_max:
+            continue
+        for neighbour in neighbours[cell]:
+            if visited >> neighbour & 1 or chars + tile_chars[neighbour] > length_max:
+                continue
+            child: int | None = dictionary.child(node, tile_codes[neighbour])
+            if child is not None:
+                push(neighbour, child, visited | 1 << neighbour, chars + tile_chars[neighbour],
+                     state if automaton is None else automaton.step(state, tiles[neighbour]), letters + (tiles[neighbour],))
+
+    if top is not None:
+        yield [word for _, _, word in sorted(best, key=lambda item: (-item[0], -item[1]))], None
+
+    counters['nodes'] = nodes
+    counters['time'] = time.time() - start_time
+    # Paths left that could still have added to the top words
+    counters['partial'] = bool(paths) and (top is None or len(best) < top
+                                           or score_length(-paths[0][0]) > best[0][0])
+    # Each path left is at least one node more to visit, and often many more below it, so this is only an upper bound
+    counters['queued'] = len(paths) if counters['partial'] else 0
+    counters['coverage_max'] = nodes / (nodes + len(paths)) if counters['partial'] else 1.0
+    counters['complete_length'] = min(-paths[0][0] + 1, length_max + 1) if counters['partial'] else length_min
+    yield [], counters
+
+
+def tile_search_init(dictionary_path: str, puzzle: list[list[str]], neighbours: tuple[tuple[int, ...], ...],
+                     length_min: int, length_max: int, word_filter: str | None, contains: list[str] | None,
+                     instrument: bool = False) -> None:
+    """
+    Load the dictionary and puzzle once in a tile search worker
+    Compact dictionaries are mapped, so the workers share the pages
+    :param dictionary_path: Path of the dictionary
+    :param puzzle: Puzzle matrix
+    :param neighbours: Neighbouring cells of each cell, see board_neighbours
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :param word_filter: Regex words must match
+    :param contains: Patterns words must contain, in any order
+    :param instrument: Count the branches cut
+    :return: (void)
+    """
+    dictionary: CompactDictionary = load_dictionary(open(dictionary_path, 'rb'))
+    tiles: list[str] = [tile for row in puzzle for tile in row]
+    tile_search.update({'dictionary': dictionary, 'tiles': tiles, 'length_min': length_min, 'length_max': length_max,
+                        'automaton': FilterAutomaton.from_options(word_filter, contains),
+                        'neighbours': neighbours, 'instrument': instrument,
+                        'tile_codes': encode_tiles(dictionary, tiles)})
+
+
+def tile_search_worker(cell: int) -> tuple[list[str], dict[str, Any]]:
+    """
+    Get all the words starting from a tile, in a tile search worker
+    :param cell: Cell of the tile
+    :return: Words found, may contain duplicates, and the counters of the search
+    """
+    return search_tile(cell, tile_search['length_min'], tile_search['length_max'], tile_search['tiles'],
+                       tile_search['tile_codes'], tile_search['neighbours'], tile_search['dictionary'], tile_search['automaton'],
+                       tile_search['instrument'])
+
+
+def load_union(dictionaries: list[Any]) -> CompactDictionary:
+    """
+    Load dictionaries to search together, merged into a union that marks each word with the dictionaries that have it
+    :param dictionaries: Dictionaries, paths or files opened in binary mode
+    :return: Union, or the dictionary if only one
+    """
+    loaded: list[CompactDictionary] = []
+    for dictionary in dictionaries:
+        if isinstance(dictionary, (str, os.PathLike)):
+            dictionary = open(dictionary, 'rb')
+        loaded.append(dictionary if isinstance(dictionary, CompactDictionary) else load_dictionary(dictionary))
+    if len(loaded) == 1:
+        return loaded[0]
+    # Not loaded from a file, so has no name, and workers cannot map it so search in a single process
+    return CompactDictionary.union(loaded)
+
+
+def load_solvers(dictionary_files: list[Any | list[Any]], cache: ResultCache | None = None) -> dict[str, Solver]:
+    """
+    Load dictionaries into solvers, keyed by the path and the file name they were loaded with
+    :param dictionary_files: Dictionaries opened in binary mode, or lists of them to search together, see load_union,
+    the first is the default
+    :param cache: Results shared by the solvers, None to always search
+    :return: Solvers by the name of their dictionary, unions by the names of theirs joined with +
+    """
+    solvers: dict[str, Solver] = {}
+    for dictionary_file in dictionary_files:
+        dictionary_group: list[Any] = dictionary_file if isinstance(dictionary_file, list) else [dictionary_file]
+        try:
+            dictionary: CompactDictionary = load_union(dictionary_group)
+        except (UnicodeDecodeError, EOFError, ValueError, pickle.UnpicklingError):
+            print_error('Dictionary may be corrupt or not a dictionary',
+                        'Verify file or reprocess dictionary: ' + ', '.join(file.name for file in dictionary_group))
+        except Exception as err:
+            print_error(f'Error loading dictionary:', str(err))
+        # Requests can use the path or the file name
+        names: list[str] = [file.name for file in dictionary_group]
+        name: str = '+'.join(names)
+        solvers[name] = Solver(dictionary, cache=cache)
+        solvers.setdefault('+'.join(os.path.basename(path) for path in names), solvers[name])
+    return solvers
+
+
+def batch_worker_init(dictionary_paths: list[str | list[str]], cache_size: int = 0,
+                      cache_dir: str | None = None) -> None:
+    """
+    Load the dictionaries once in a batch worker
+    :param dictionary_paths: Paths of the dictionaries, or lists of them to search together, the first is the default
+    :param cache_size: Results kept in memory by the worker
+    :param cache_dir: Directory of results shared by the workers, None for memory only
+    :return: (void)
+    """
+    cache: ResultCache | None = ResultCache(cache_size, cache_dir) if cache_size or cache_dir else None
+    batch_solvers.update(load_solvers([[open(path, 'rb') for path in paths] if isinstance(paths, list) else open(paths, 'rb')
+                                       for paths in dictionary_paths], cache))
+    # Forked workers would otherwise generate the same puzzles
+    random.seed()
+
+
+def batch_solve(job: tuple[int, str]) -> tuple[bool, str]:
+    """
+    Solve one line of a batch
+    :param job: Line number and line, a JSON request or space separated tiles
+    :return: Whether it was solved, and the results or error as a line of JSON, with the line number and the request id
+    if given
+    """
+    line_number, line = job
+    start_time: float = time.time()
+    try:
+        request: dict[str, Any] = json.loads(line) if line.startswith('{') else {'puzzle': line.split()}
+        results: dict[str, Any] = solve_request(request, batch_solvers)
+    except (ValueError, TypeError) as err:
+        return False, json.dumps({'line': line_number, 'error': 'Invalid request', 'detail': str(err)})
+
+    if 'id' in request:
+        results['id'] = request['id']
+    results['line'] = line_number
+    results['stats']['dictionary_load_time'] = 0.0
+    results['stats']['total_time'] = time.time() - start_time
+    return True, json.dumps(results)
+
+
+def solve_batch(source: Any, dictionary_files: list[Any | list[Any]], workers: int | None = None,
+                output: Any = sys.stdout, cache_size: int = 0, cache_dir: str | None = None) -> None:
+    """
+    Solve a stream of puzzles across a pool of workers, writing results as JSON lines as they finish
+    :param source: Opened file with a puzzle per line, a JSON request (see solve_request) or space separated tiles
+    :param dictionary_files: Dictionaries opened in binary mode, or lists of them to search together, the first is the default
+    :param workers: Number of worker processes, default number of cores
+    :param output: File to write results to
+    :param cache_size: Results kept in memory by each worker, 0 for none
+    :param cache_dir: Directory of results shared by the workers, None for memory only
+    :return: (void)
+    """
+    start_time: float = time.time()
+    # Workers open the dictionaries themselves
+    dictionary_paths: list[str | list[str]] = []
+    for dictionary_file in dictionary_files:
+        if isinstance(dictionary_file, list):
+            dictionary_paths.append([file.name for file in dictionary_file])
+            for file in dictionary_file:
+                file.close()
+        else:
+            dictionary_paths.append(dictionary_file.name)
+            dictionary_file.close()
+
+    # Skip blank lines and comments, numbering the lines so results can be matched up
+    jobs = ((line_number, line.strip()) for line_number, line in enumerate(source, 1)
+            if line.strip() and not line.lstrip().startswith('#'))
+
+    puzzle_count, error_count = 0, 0
+    workers: int = workers or os.cpu_count() or 1
+    if workers == 1:
+        batch_worker_init(dictionary_paths, cache_size, cache_dir)
+        results = map(batch_solve, jobs)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers, batch_worker_init, (dictionary_paths, cache_size, cache_dir))
+        results = pool.imap_unordered(batch_solve, jobs, BATCH_CHUNK_SIZE)
+
+    try:
+        for solved, result in results:
+            puzzle_count += 1
+            error_count += not solved
+            print(result, file=output, flush=True)
+    finally:
+        if pool:
+            pool.terminate()
+
+    total_time: float = time.time() - start_time
+    print(f'Solved {puzzle_count - error_count} puzzles, {error_count} errors, in {total_time:0.3f}s '
+          f'with {workers} workers, {puzzle_count / total_time if total_time else 0.0:0.1f} puzzles/s', file=sys.stderr)
+
+
 def win_press_key(key: str | None = None, modifier: str | None = None, hold_time: float = 0.1) -> None:
     """
     Emulate a keyboard press, <enter> default
@@ -365,7 +2384,8 @@ def win_press_key(key: str | None = None, modifier: str | None = None, hold_time
     ctypes.windll.user32.keybd_event(code, 0, 0x0002, 0)
 
 
-def get_words(x: int, y: int, length: int, word: str, words: list[str], used_squares: list[tuple], puzzle: list[list[str]], dictionary: dict[str, Any]) -> None:
+def get_words(x: int, y: int, length: int, word: str, words: list[str], used_squares: list[tuple],
+              puzzle: list[list[str]], dictionary: dict[str, Any], word_filter: str | None = None) -> int:
     """
     Get a word starting from a position and to a length
     Note: Recursive
@@ -377,9 +2397,11 @@ def get_words(x: int, y: int, length: int, word: str, words: list[str], used_squ
     :param used_squares: For recursion, track used positions
     :param puzzle: Puzzle matrix
     :param dictionary: Hierarchy dictionary
-    :return: (void)
+    :param word_filter: Regex the start of the word must match
+    :return: Number of nodes visited
     """
     row_count = len(puzzle)
+    nodes: int = 1
 
     # If we haven't reached the end of the path, move to the next positions and recurse
     if length > 1:
@@ -393,19 +2415,130 @@ def get_words(x: int, y: int, length: int, word: str, words: list[str], used_squ
                         new_used_squares: list[tuple] = used_squares.copy()
                         new_used_squares.append((temp_x, temp_y))
                         # Check that part of the word is in the dictionary before continuing
-                        if options.filter:
-                            regex: re.Match[str] = re.match(options.filter, word)
+                        if word_filter:
+                            regex: re.Match[str] = re.match(word_filter, word)
                         else:
                             regex: bool = True
                         if lookup_word(dictionary, word + puzzle[temp_x][temp_y]) and regex:
-                            get_words(temp_x, temp_y, length - 1, word + puzzle[temp_x][temp_y], words,
-                                      new_used_squares, puzzle, dictionary)
+                            nodes += get_words(temp_x, temp_y, length - 1, word + puzzle[temp_x][temp_y], words,
+                                               new_used_squares, puzzle, dictionary, word_filter)
 
     # Append the word to the list
     if length <= 1:
         if lookup_word(dictionary, word + '\n'):
             words.append(word)
-        return
+    return nodes
+
+
+def search_words(cell: int, node: int, visited: int, length: int, chars: int, length_min: int, length_max: int,
+                 letters: list[str], words: dict[int, list[str]], counters: dict[str, int] | None, tiles: list[str],
+                 tile_codes: list[tuple], neighbours: tuple[tuple[int, ...], ...], dictionary: CompactDictionary,
+                 automaton: FilterAutomaton | None = None, state: int = 0, window: bool = False) -> int:
+    """
+    Get all the words starting from a position, between two lengths, in a single pass
+    Note: Recursive
+    :param cell: Cell of the position
+    :param node: Dictionary node reached by the letters so far
+    :param visited: Bitmask of the cells used so far
+    :param length: Length of the path so far, in tiles
+    :param chars: Length of the path so far, in characters
+    :param length_min: Minimum length of words to find, in characters
+    :param length_max: Maximum length of words to find, in characters
+    :param letters: For recursion, tiles of the path so far, should start with the tile at the position
+    :param words: Found words, keyed by length in tiles
+    :param counters: Branches cut, by dictionary, filter and length, counted as they are cut, None to not count
+    :param tiles: Tile of each cell
+    :param tile_codes: Letter codes of each cell, see CompactDictionary.encode
+    :param neighbours: Neighbouring cells of each cell, see board_neighbours
+    :param dictionary: Compact dictionary
+    :param automaton: Filters words must match, None for no filters
+    :param state: Filter state reached by the letters so far
+    :param window: Cut paths whose words through the dictionary are all too short or too long, see length_window
+    :return: Number of nodes visited
+    """
+    nodes: int = 1
+
+    # Append the word to the list, only now is the word put together
+    if chars >= length_min and dictionary.terminal(node) and (automaton is None or automaton.accepts(state, letters)):
+        words[length].append(''.join(letters))
+
+    # Every tile has a letter, so none can follow a word of the maximum length
+    if chars >= length_max:
+        if counters is not None:
+            counters['length'] += 1
+        return nodes
+
+    # Move to the next positions and recurse
+    child_state: int | None = state
+    for neighbour in neighbours[cell]:
+        if visited >> neighbour & 1:
+            continue
+        # Stop where the filters can no longer match, or what they still need cannot fit
+        if automaton is not None:
+            child_state = automaton.step(state, tiles[neighbour])
+            if child_state is None:
+                if counters is not None:
+                    counters['filter'] += 1
+                continue
+            if chars + len(tiles[neighbour]) + automaton.distance[child_state] > length_max:
+                if counters is not None:
+                    counters['length'] += 1
+                continue
+        # Step down from the current node rather than from the top of the dictionary
+        child: int | None = dictionary.child(node, tile_codes[neighbour])
+        if child is None:
+            if counters is not None:
+                counters['dictionary'] += 1
+        elif chars + len(tiles[neighbour]) > length_max:
+            # Only a tile of more than one letter can still make the word too long
+            if counters is not None:
+                counters['length'] += 1
+        elif window and (chars + len(tiles[neighbour]) + dictionary.node_shortest[child] > length_max
+                         or chars + len(tiles[neighbour]) + dictionary.node_longest[child] < length_min):
+            # No word through the child fits the lengths, ex: all too long for -M or too short for -m
+            if counters is not None:
+                counters['length'] += 1
+        else:
+            letters.append(tiles[neighbour])
+            nodes += search_words(neighbour, child, visited | 1 << neighbour, length + 1, chars + len(tiles[neighbour]),
+                                  length_min, length_max, letters, words, counters, tiles, tile_codes, neighbours,
+                                  dictionary, automaton, child_state, window)
+            letters.pop()
+    return nodes
+
+
+def search_paths(cell: int, node: int, visited: int, cells: list[int], chars: int, length_max: int,
+                 paths: list[tuple[tuple[int, ...], int]], tiles: list[str], tile_codes: list[tuple],
+                 neighbours: tuple[tuple[int, ...], ...], dictionary: CompactDictionary) -> int:
+    """
+    Get all the paths from a position that the dictionary continues, words or not
+    Note: Recursive
+    :param cell: Cell of the position
+    :param node: Dictionary node reached by the letters so far
+    :param visited: Bitmask of the cells used so far
+    :param cells: For recursion, cells of the path so far, should end with the position
+    :param chars: Length of the path so far, in characters
+    :param length_max: Maximum length of paths to find, in characters
+    :param paths: Found paths and the dictionary node each reaches
+    :param tiles: Tile of each cell
+    :param tile_codes: Letter codes of each cell, see CompactDictionary.encode
+    :param neighbours: Neighbouring cells of each cell, see board_neighbours
+    :param dictionary: Compact dictionary
+    :return: Number of nodes visited
+    """
+    nodes: int = 1
+    paths.append((tuple(cells), node))
+
+    for neighbour in neighbours[cell]:
+        if visited >> neighbour & 1 or chars + len(tiles[neighbour]) > length_max:
+            continue
+        child: int | None = dictionary.child(node, tile_codes[neighbour])
+        if child is not None:
+            cells.append(neighbour)
+            nodes += search_paths(neighbour, child, visited | 1 << neighbour, cells, chars + len(tiles[neighbour]),
+                                  length_max, paths, tiles, tile_codes, neighbours, dictionary)
+            cells.pop()
+    return nodes
 
 
 def lookup_word(dictionary: dict[str, str | dict], word: str) -> bool:
@@ -503,11 +2636,88 @@ if __name__ == '__main__':
     dictionary_group = parser.add_argument_group(title='Dictionary',
                                                  description=None)
     dictionary_group.add_argument('-d', '--dict', type=argparse.FileType('rb'),
-                                  action='store', dest='dictionary',
+                                  action='store', dest='dictionary', nargs='+',
                                   default=os.path.join(os.path.dirname(__file__), 'dictionary.hd'),
                                   help='dictionary file to use, in .hd format, See convert_dictionary.py\n'
+                                       'compact dictionaries are memory mapped, pickled dictionaries are still read\n'
+                                       'several are searched together in one pass, each word marked with the dictionaries that have it\n'
+                                       'they are merged on every run, for a fast start build them into one with convert_dictionary.py -u\n'
                                        'default: %(default)s')
 
+    # Server
+    serve_group = parser.add_argument_group(title='Server',
+                                            description='Keep dictionaries loaded and solve puzzles sent as JSON')
+    serve_group.add_argument('--serve', type=str,
+                             action='store', dest='serve', default=None, nargs='?',
+                             const='localhost:8470',
+                             metavar='ADDRESS',
+                             help='serve requests on host:port or a Unix socket path\n'
+                                  'POST /solve with a puzzle and options, GET /stats for request counts and latency\n'
+                                  'default: %(const)s')
+    serve_group.add_argument('--serve-dict', type=argparse.FileType('rb'),
+                             action='append', dest='serve_dictionaries', default=[],
+                             metavar='DICTIONARY',
+                             help='additional dictionary to serve or use in batches, requests choose it by path or file name\n'
+                                  'the -d/--dict dictionary is the default')
+    serve_group.add_argument('--batch', type=argparse.FileType('r'),
+                             action='store', dest='batch', default=None, nargs='?',
+                             const='-',
+                             metavar='FILE',
+                             help='solve a puzzle per line, written as JSON lines as each is solved\n'
+                                  'a line is a JSON request as sent to the server, or space separated tiles\n'
+                                  'default: %(const)s (stdin)')
+    serve_group.add_argument('--workers', type=int,
+                             action='store', dest='workers', default=None,
+                             help='number of worker processes\n'
+                                  'batches spread puzzles over the workers, default number of cores\n'
+                                  'single puzzles spread start tiles over the workers, default 1')
+    serve_group.add_argument('--quiet', default=False,
+                             action='store_true', dest='quiet',
+                             help='do not log each request')
+
+    # Search
+    search_group = parser.add_argument_group(title='Search',
+                                             description='Choose how the puzzle is searched')
+    search_group.add_argument('--engine', choices=['single', 'frontier', 'legacy'],
+                              action='store', dest='engine', default='single',
+                              help='search engine to use\n'
+                                   'single: walk each path once, finding words of all lengths\n'
+                                   'frontier: step all paths at once as NumPy arrays, faster on large puzzles\n'
+                                   'legacy: search each tile once per word length, for comparison\n'
+                                   'default: %(default)s')
+    search_group.add_argument('--deadline', type=float,
+                              action='store', dest='deadline', default=None,
+                              metavar='SECONDS',
+                              help='search longest words first, stopping after this long with the words found so far\n'
+                                   'example: 0.2')
+    search_group.add_argument('--top', type=int,
+                              action='store', dest='top', default=None,
+                              metavar='K',
+                              help='only the K highest scoring words, highest first, skipping paths that cannot score more')
+    search_group.add_argument('--prune', default=False,
+                              action='store_true', dest='prune',
+                              help='search a copy of the dictionary pruned to the letters of the puzzle\n'
+                                   'pruned copies are kept, this pays off when the same tiles are solved again')
+    search_group.add_argument('--instrument', default=False,
+                              action='store_true', dest='instrument',
+                              help='count the branches cut by the dictionary, filters and length, duplicate words\n'
+                                   'and the time, nodes and words from each start tile, added to the stats')
+    search_group.add_argument('--profile', default=None,
+                              action='store', dest='profile', nargs='?', const='-',
+                              metavar='PATH',
+                              help='profile the search, printing the hot spots to stderr or saving the profile to PATH\n'
+                                   'tile search workers are not profiled, use without --workers')
+    search_group.add_argument('--cache-size', type=int,
+                              action='store', dest='cache_size', default=RESULT_CACHE_SIZE,
+                              metavar='RESULTS',
+                              help='results of puzzles kept in memory by the server and batch workers, 0 for none\n'
+                                   'turned and flipped puzzles share results\n'
+                                   'default: %(default)s')
+    search_group.add_argument('--cache-dir', type=str,
+                              action='store', dest='cache_dir', default=None,
+                              metavar='PATH',
+                              help='also keep results in a directory, shared by runs and workers')
+
     # Puzzle
     puzzle_group = parser.add_argument_group(title='Puzzle',
                                              description='Specify or generate a puzzle')
@@ -531,6 +2741,21 @@ if __name__ == '__main__':
                               action='store_true', dest='puzzle_standard',
                               help='standard puzzle, consisting on 16 dies in 4x4 grid')
 
+    puzzle_group.add_argument('--columns', type=int,
+                              action='store', dest='columns', default=None,
+                              help='lay the tiles out in rows of this many, -s is then the number of rows\n'
+                                   'default: a square')
+
+    puzzle_group.add_argument('--torus', default=False,
+                              action='store_true', dest='torus',
+                              help='the edges of the puzzle wrap around to the other side')
+
+    puzzle_group.add_argument('--adjacency', type=argparse.FileType('r'),
+                              action='store', dest='adjacency', default=None,
+                              metavar='FILE',
+                              help='JSON list of the neighbours of each tile, tiles numbered from 0 in the order given\n'
+                                   'example: [[1], [0, 2], [1]] is a line of 3 tiles')
+
     # Display
     display_group = parser.add_argument_group(title='Display',
                                               description='Viewing and sorting options')
@@ -550,6 +2775,11 @@ if __name__ == '__main__':
                                action='store_true', dest='list', default=False,
                                help='display as list instead of columns\n'
                                     'default: %(default)s')
+    display_group.add_argument('--stream',
+                               action='store_true', dest='stream', default=False,
+                               help='display each word as soon as it is found, as a list or JSON lines with --json\n'
+                                    'the stats follow the words, words cannot be ordered\n'
+                                    'default: %(default)s')
     display_group.add_argument('--json',
                                action='store_true', dest='json', default=False,
                                help='display as JSON\n')
@@ -567,7 +2797,7 @@ if __name__ == '__main__':
     filter_group.add_argument('-M', '--max', type=number_range(1, 32),
                               action='store', dest='length_max', default=None,
                               help='maximum word length \n'
-                                   'default: puzzle size or 32 whichever is less')
+                                   'default: letters on the puzzle or 32 whichever is less')
     filter_group.add_argument('-m', '--min', type=number_range(1, 32),
                               action='store', dest='length_min', default=3,
                               help='minimum word length\n'
@@ -584,6 +2814,7 @@ if __name__ == '__main__':
                               metavar='REGEX',
                               help='filter results after contains filter\n'
                                    'note: Only exact matches are found. \n'
+                                   'note: Followed during the search, paths that can no longer match are skipped\n'
                                    'examples:\n'
                                    'z will find only z, z.* will find all words beginning with z \n'
                                    '.{3}|.{5} will find 3 or 5 letter words\n'
@@ -613,5 +2844,19 @@ if __name__ == '__main__':
                                      'default: %(default)s')
 
     options = parser.parse_args()
-
-    main()
+    if options.columns is not None and options.columns < 1:
+        parser.error('--columns must be at least 1')
+    # The default is opened as a single file rather than a list
+    if not isinstance(options.dictionary, list):
+        options.dictionary = [options.dictionary]
+    # Several dictionaries are served as one, searched together
+    dictionary_default: Any = options.dictionary if len(options.dictionary) > 1 else options.dictionary[0]
+
+    if options.serve:
+        serve(options.serve, [dictionary_default] + options.serve_dictionaries, options.quiet,
+              ResultCache(options.cache_size, options.cache_dir) if options.cache_size or options.cache_dir else None)
+    elif options.batch:
+        solve_batch(options.batch, [dictionary_default] + options.serve_dictionaries, options.workers,
+                    cache_size=options.cache_size, cache_dir=options.cache_dir)
+    else:
+        main()
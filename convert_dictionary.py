@@ -13,13 +13,50 @@ Converts a list of words to a hierarchy format for fast parsing
 __author__ = "thedzy"
 __copyright__ = "Copyright 2020, thedzy"
 __license__ = "GPL"
-__version__ = "1.1.1"
+__version__ = "1.2.0"
 __maintainer__ = "thedzy"
 __email__ = "thedzy@hotmail.com"
 __status__ = "Development"
 
 import argparse
+import array
+import hashlib
+import heapq
+import itertools
+import mmap
+import os
 import pickle
+import struct
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Compact dictionary layout
+# Header, alphabet (utf-8, padded to 4 bytes), names of the sources (utf-8, one per line, padded to 4 bytes), then the tables:
+#   node_first   uint32 per node, index of the node's first edge
+#   edge_nodes   uint32 per edge, node the edge leads to
+#   node_sources uint32 per node, only in unions, bit n set if source n has the word ending at the node
+#   node_edges   uint8 per node, number of edges from the node
+#   node_flags   uint8 per node, FLAG_WORD if a word ends at the node
+#   node_shortest uint8 per node, letters still to come in the shortest word through the node, NO_WORD if none
+#   node_longest uint8 per node, letters still to come in the longest word through the node, NO_WORD if none
+#   edge_letters uint8 per edge, index of the edge's letter in the alphabet
+COMPACT_MAGIC = b'BGHD'
+COMPACT_VERSION = 4
+COMPACT_HEADER = struct.Struct('<4sHHIIHH')
+FLAG_WORD = 0x01
+# Most dictionaries a union can be made from, a bit each
+SOURCES_MAX = 32
+# Longest word length for nodes that no word continues from, longer words are counted as the longest stored
+NO_WORD = 0xff
+# Letter code for letters outside the alphabet, never stored on an edge
+NO_LETTER = b'\xff'
+# Words looked up at a time in bulk, lookups in a batch are put in order to share the steps of common starts
+LOOKUP_BATCH = 100000
 
 
 def main():
@@ -28,59 +65,691 @@ def main():
 
     # If given a source, then convert, otherwise load and test
     if options.dictionary is not None:
+        merge = load_dictionary(options.merge) if options.merge is not None else None
+        if merge is not None and merge.sources:
+            # New words belong to none of the dictionaries the union was made from
+            parser.error('cannot merge into a union, make the union again with -u')
+
         print('Creating')
-        words = options.source.readlines()
-        options.source.close()
+        start_time = time.time()
 
+        # Merge into an existing dictionary, then stream the source, adding words as they are read
+        sources = []
+        if merge is not None:
+            sources.append(merge.entries())
+        if options.source is not None:
+            sources.append(read_words(options.source))
         if options.add_words:
-            for add_word in options.add_words:
-                words.append(add_word + '\n')
+            sources.append(sorted(read_words(add_word + '\n' for add_word in options.add_words)))
+        remove = {letters for letters, _ in read_words(word + '\n' for word in options.remove_words or [])}
+
+        tree_dictionary = build_compact(sources, remove)
+        if options.union:
+            # The source and words added are a dictionary of their own in the union
+            unions = [load_dictionary(union_file) for union_file in options.union]
+            names = [os.path.basename(union_file.name) for union_file in options.union]
+            if sources:
+                unions.append(tree_dictionary)
+                names.append(os.path.basename(options.source.name) if options.source is not None else 'added')
+            tree_dictionary = CompactDictionary.union(unions, names)
+        if options.source is not None:
+            options.source.close()
 
-        for word in words:
-            if not word.rstrip('\n').isalpha():
-                word = ''.join(char for char in word if char.isalnum())
-            add_to_dictionary(tree_dictionary, word.lower())
+        # Write alongside and then replace, the dictionary merged into may be the one written
+        with open(options.dictionary + '.tmp', 'wb') as dictionary_file:
+            if options.format == 'pickle':
+                pickle.dump(tree_dictionary.to_tree(), dictionary_file)
+            else:
+                tree_dictionary.write(dictionary_file)
+        os.replace(options.dictionary + '.tmp', options.dictionary)
 
-        pickle.dump(tree_dictionary, options.dictionary)
+        word_count = sum(1 for flags in tree_dictionary.node_flags if flags & FLAG_WORD)
+        print('Built {} words, {} nodes in {:0.3f}s'.format(word_count, tree_dictionary.node_count, time.time() - start_time))
+        if resource is not None:
+            # Kilobytes except on macOS
+            peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+            print('Peak memory {:0.1f}MiB'.format(peak_memory / 2 ** 20))
     else:
         test_dictionary = open(options.source.name, 'rb')
         options.source.close()
-        tree_dictionary = pickle.load(test_dictionary)
+        tree_dictionary = load_dictionary(test_dictionary)
 
     if options.word is not None:
-        if options.exact:
-            found = lookup_word(tree_dictionary, options.word + '\n')
-        else:
-            found = lookup_word(tree_dictionary, options.word)
+        found = tree_dictionary.lookup(options.word, options.exact)
         print('Found match for {}: {}'.format(options.word, found))
 
+    if options.lookup is not None:
+        start_time = time.time()
+        word_count, hit_count = lookup_lines(tree_dictionary, options.lookup, options.output, options.exact)
+        lookup_time = time.time() - start_time
+        # Report apart from the results, which may be on stdout
+        print('Looked up {} words, {} found, in {:0.3f}s, {:0.0f} words/s'.format(
+            word_count, hit_count, lookup_time, word_count / lookup_time if lookup_time else 0), file=sys.stderr)
+
+
+def read_words(lines):
+    """
+    Read words as they would be added to the dictionary, one at a time
+    Only lines ending in a new line are words, others only add the start of words
+    :param lines: (iterable) Lines, ex: an open file
+    :return: (generator) Letters and whether they are a word
+    """
+    for word in lines:
+        if not word.rstrip('\n').isalpha():
+            word = ''.join(char for char in word if char.isalnum())
+        word = word.lower()
+        letters = word.rstrip('\n')
+        if letters:
+            yield letters, letters != word
+
+
+def build_compact(sources, remove=()):
+    """
+    Build a compact dictionary from sources of words, without holding the words or a hierarchy of letters
+    Sources in order are merged as they are read, words out of order are kept and merged in afterwards
+    :param sources: (list) Sources of letters and whether they are a word, see read_words and CompactDictionary.entries
+    :param remove: (set) Words to leave out
+    :return: (CompactDictionary) Dictionary
+    """
+    pending = []
+    dictionary = DictionaryBuilder().build(heapq.merge(*(_in_order(source, pending) for source in sources)), remove)
+    if pending:
+        pending.sort()
+        dictionary = DictionaryBuilder().build(heapq.merge(dictionary.entries(), pending), remove)
+    return dictionary
+
+
+def _in_order(source, pending):
+    """
+    Pass on the entries of a source that are in order, keeping the others
+    :param source: (iterable) Letters and whether they are a word
+    :param pending: (list) Entries out of order
+    :return: (generator) Entries in order
+    """
+    previous = ''
+    for entry in source:
+        if entry[0] < previous:
+            pending.append(entry)
+            continue
+        previous = entry[0]
+        yield entry
+
+
+def _with_source(source, bit):
+    """
+    Mark the entries of a source with its bit, to tell them apart when merged
+    :param source: (iterable) Letters and whether they are a word
+    :param bit: (int) Bit of the source
+    :return: (generator) Letters, whether they are a word and the bit
+    """
+    for letters, word in source:
+        yield letters, word, bit
+
 
-def add_to_dictionary(dictionary, word):
+def lookup_lines(dictionary, lines, output, exact=False, batch_size=LOOKUP_BATCH):
     """
-    Add word to the dictionary
-    :param dictionary: (dict) Hierarchy of letters
-    :param word: (string) Word to add
-    :return: (void)
+    Look up a word per line, ex: from a file or stdin, in batches, writing each word and whether it was found
+    The lines are read as they are needed, only a batch is held at a time
+    :param dictionary: (CompactDictionary) Dictionary, loaded once for all the words
+    :param lines: (iterable) Lines, ex: an open file
+    :param output: (file) Where to write the word, a tab, and 'hit' or 'miss' for each line with a word
+    :param exact: (bool) Match only whole words
+    :param batch_size: (int) Words to look up at a time
+    :return: (tuple) Words looked up and words found
     """
-    if len(word) != 0:
-        if word[0] not in dictionary:
-            dictionary[word[0]] = {}
-        add_to_dictionary(dictionary[word[0]], word[1:])
+    lines = iter(lines)
+    word_count, hit_count = 0, 0
+    while True:
+        batch = list(itertools.islice(lines, batch_size))
+        if not batch:
+            return word_count, hit_count
+        words = [word for word in (line.strip() for line in batch) if word]
+        found = dictionary.lookup_words([word.lower() for word in words], exact)
+        output.write(''.join('{}\t{}\n'.format(word, 'hit' if hit else 'miss') for word, hit in zip(words, found)))
+        word_count += len(words)
+        hit_count += sum(found)
 
 
-def lookup_word(dictionary, word):
+def load_dictionary(file):
     """
-    Find a word or start of a word in the dictionary
-    :param dictionary: (dict) Hierarchy of letters
-    :param word: (string) Word to lookup
-    :return: (bool) Found status
+    Load a dictionary in the compact format, or the older pickled hierarchy
+    :param file: (file) Dictionary opened in binary mode
+    :return: (CompactDictionary) Dictionary
+    """
+    if file.read(len(COMPACT_MAGIC)) == COMPACT_MAGIC:
+        dictionary = CompactDictionary.open(file)
+        dictionary.name = file.name
+        return dictionary
+
+    # Fall back to the pickled hierarchy of letters
+    file.seek(0)
+    tree_dictionary = pickle.load(file)
+    file.close()
+    dictionary = CompactDictionary.from_tree(tree_dictionary)
+    dictionary.name = file.name
+    return dictionary
+
+
+class CompactDictionary:
     """
-    for letter in word:
+    Hierarchy of letters held in flat node and edge tables
+    Nodes are numbered from the root at 0, a node's edges are stored together
+    Mapped from disk, the tables are used in place and shared between processes
+    """
+
+    ROOT = 0
+
+    def __init__(self, buffer):
+        """
+        Read the tables from a buffer holding a compact dictionary
+        :param buffer: (bytes|mmap) Compact dictionary
+        """
+        if len(buffer) < COMPACT_HEADER.size:
+            raise ValueError('Not a compact dictionary or unsupported version, reprocess the dictionary')
+        magic, version, alphabet_size, node_count, edge_count, source_count, names_size = COMPACT_HEADER.unpack_from(buffer, 0)
+        if magic != COMPACT_MAGIC or version != COMPACT_VERSION:
+            raise ValueError('Not a compact dictionary or unsupported version, reprocess the dictionary')
+
+        offset = COMPACT_HEADER.size
+        self.alphabet = bytes(buffer[offset:offset + alphabet_size]).decode('utf-8')
+        offset += alphabet_size + (-alphabet_size % 4)
+        # Names of the dictionaries a union was made from, none for a single dictionary
+        self.sources = bytes(buffer[offset:offset + names_size]).decode('utf-8').split('\n') if source_count else []
+        offset += names_size + (-names_size % 4)
+
+        self.buffer = buffer
+        self.node_count = node_count
+        self.edge_count = edge_count
+        self.node_first = _table(buffer, offset, node_count, 'I')
+        offset += node_count * 4
+        self.edge_nodes = _table(buffer, offset, edge_count, 'I')
+        offset += edge_count * 4
+        self.node_sources = _table(buffer, offset, node_count, 'I') if source_count else None
+        offset += node_count * 4 if source_count else 0
+        self.node_edges = _table(buffer, offset, node_count, 'B')
+        offset += node_count
+        self.node_flags = _table(buffer, offset, node_count, 'B')
+        offset += node_count
+        self.node_shortest = _table(buffer, offset, node_count, 'B')
+        offset += node_count
+        self.node_longest = _table(buffer, offset, node_count, 'B')
+        offset += node_count
+        # Letters are searched in the buffer directly, so only keep where they start
+        self.letters_offset = offset
+
+        self.codes = {letter: bytes([code]) for code, letter in enumerate(self.alphabet)}
+        # Where the dictionary was loaded from, if from a file
+        self.name = None
+        self._tree = None
+        self._digest = None
+
+    @classmethod
+    def open(cls, file):
+        """
+        Map a compact dictionary file into memory
+        :param file: (file) Dictionary opened in binary mode
+        :return: (CompactDictionary) Dictionary
+        """
         try:
-            dictionary = dictionary[letter]
-        except KeyError:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            file.close()
+        return cls(buffer)
+
+    @classmethod
+    def from_tree(cls, tree_dictionary):
+        """
+        Flatten a hierarchy of letters into the compact tables
+        :param tree_dictionary: (dict) Hierarchy of letters, words end with '\\n'
+        :return: (CompactDictionary) Dictionary
+        """
+        alphabet = {}
+        node_first, edge_nodes = array.array('I'), array.array('I')
+        node_edges, node_flags, edge_letters = bytearray(), bytearray(), bytearray()
+
+        # Breadth first, numbering the nodes in the order they are queued
+        nodes = [tree_dictionary]
+        for node in nodes:
+            node_first.append(len(edge_nodes))
+            node_flags.append(FLAG_WORD if '\n' in node else 0)
+            edge_count = 0
+            for letter, child in node.items():
+                if letter == '\n':
+                    continue
+                if letter not in alphabet:
+                    if len(alphabet) >= 255:
+                        raise ValueError('Too many distinct letters for a compact dictionary')
+                    alphabet[letter] = len(alphabet)
+                edge_letters.append(alphabet[letter])
+                edge_nodes.append(len(nodes))
+                nodes.append(child)
+                edge_count += 1
+            node_edges.append(edge_count)
+
+        return cls(_pack(''.join(alphabet), node_first, edge_nodes, node_edges, node_flags, edge_letters))
+
+    @classmethod
+    def union(cls, dictionaries, names=None):
+        """
+        Merge dictionaries into one, each word marked with the dictionaries that have it, see word_sources
+        Searching the union finds the words of every dictionary in one pass
+        :param dictionaries: (list) Dictionaries
+        :param names: (list) Name of each dictionary, default the names they were loaded with
+        :return: (CompactDictionary) Dictionary
+        """
+        if not 1 <= len(dictionaries) <= SOURCES_MAX:
+            raise ValueError('A union is made from 1 to {} dictionaries'.format(SOURCES_MAX))
+        names = [str(name) for name in names or [dictionary.name or index + 1
+                                                 for index, dictionary in enumerate(dictionaries)]]
+        if any('\n' in name for name in names):
+            raise ValueError('Dictionary names cannot have line breaks')
+
+        # Entries of every dictionary in order, the same letters together, each with the bit of its dictionary
+        entries = heapq.merge(*(_with_source(dictionary.entries(), 1 << index) for index, dictionary in enumerate(dictionaries)))
+        builder = DictionaryBuilder(names)
+        for letters, group in itertools.groupby(entries, key=lambda entry: entry[0]):
+            sources = 0
+            for _, word, source in group:
+                if word:
+                    sources |= source
+            builder.add(letters, bool(sources), sources)
+        return builder.finish()
+
+    def write(self, file):
+        """
+        Write the dictionary to a file
+        :param file: (file) File opened in binary mode
+        :return: (void)
+        """
+        file.write(self.buffer)
+
+    def digest(self):
+        """
+        Get a hash of the dictionary tables, to tell dictionaries apart by their content rather than their name
+        Note: Cached
+        :return: (string) SHA-256 in hex
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.buffer).hexdigest()
+        return self._digest
+
+    def encode(self, letters):
+        """
+        Get the letter codes used to step through the dictionary
+        :param letters: (string) Letters, ex: a tile
+        :return: (tuple) Letter codes
+        """
+        return tuple(self.codes.get(letter, NO_LETTER) for letter in letters)
+
+    def child(self, node, codes):
+        """
+        Step from a node through letter codes
+        :param node: (int) Node
+        :param codes: (tuple) Letter codes, see encode
+        :return: (int|None) Node reached or None if no word continues with the letters
+        """
+        for code in codes:
+            first = self.letters_offset + self.node_first[node]
+            index = self.buffer.find(code, first, first + self.node_edges[node])
+            if index < 0:
+                return None
+            node = self.edge_nodes[index - self.letters_offset]
+        return node
+
+    def terminal(self, node):
+        """
+        Does a word end at the node
+        :param node: (int) Node
+        :return: (bool) Word ends
+        """
+        return bool(self.node_flags[node] & FLAG_WORD)
+
+    def word_sources(self, word):
+        """
+        Get the names of the dictionaries that have a word, for a union the dictionaries it was made from
+        :param word: (string) Word
+        :return: (list) Names, in the order the dictionaries were given, empty if none has the word
+        """
+        node = self.child(self.ROOT, self.encode(word))
+        if node is None or not self.terminal(node):
+            return []
+        if self.node_sources is None:
+            return [self.name]
+        sources = self.node_sources[node]
+        return [name for index, name in enumerate(self.sources) if sources >> index & 1]
+
+    def lookup(self, word, exact=False):
+        """
+        Find a word or start of a word in the dictionary
+        :param word: (string) Word to lookup
+        :param exact: (bool) Match only whole words
+        :return: (bool) Found status
+        """
+        node = self.child(self.ROOT, self.encode(word))
+        if node is None:
             return False
-    return True
+        return self.terminal(node) if exact else True
+
+    def lookup_words(self, words, exact=False):
+        """
+        Find a batch of words or starts of words in the dictionary
+        The words are looked up in order, so only the letters a word does not share with the word before are stepped through
+        :param words: (list) Words to lookup
+        :param exact: (bool) Match only whole words
+        :return: (list) Found status of each word, in the order given
+        """
+        buffer, letters_offset, codes = self.buffer, self.letters_offset, self.codes
+        node_first, node_edges, node_flags, edge_nodes = self.node_first, self.node_edges, self.node_flags, self.edge_nodes
+
+        found = [False] * len(words)
+        # Nodes reached by each letter of the word before, as far as the dictionary went
+        path = [self.ROOT]
+        previous = ''
+        for position in sorted(range(len(words)), key=words.__getitem__):
+            word = words[position]
+            shared = 0
+            limit = min(len(word), len(path) - 1)
+            while shared < limit and word[shared] == previous[shared]:
+                shared += 1
+            del path[shared + 1:]
+            node = path[-1]
+            for letter in word[shared:]:
+                first = letters_offset + node_first[node]
+                index = buffer.find(codes.get(letter, NO_LETTER), first, first + node_edges[node])
+                if index < 0:
+                    node = None
+                    break
+                node = edge_nodes[index - letters_offset]
+                path.append(node)
+            previous = word
+            found[position] = node is not None and (not exact or bool(node_flags[node] & FLAG_WORD))
+        return found
+
+    def restrict(self, letters):
+        """
+        Make a dictionary of only the words that can be spelt from some letters, ex: the letters of a puzzle
+        Each letter can be used as many times as it is given
+        :param letters: (string) Letters available
+        :return: (CompactDictionary) Dictionary, with the same letter codes
+        """
+        counts = [0] * len(self.alphabet)
+        for letter in letters:
+            if letter in self.codes:
+                counts[self.codes[letter][0]] += 1
+
+        node_first, edge_nodes = array.array('I'), array.array('I')
+        node_edges, node_flags, edge_letters = bytearray(), bytearray(), bytearray()
+        node_sources = array.array('I') if self.node_sources is not None else None
+
+        def copy_node(node):
+            # Number the node now, its edges are added once the nodes below are copied
+            new_node = len(node_flags)
+            node_first.append(0)
+            node_edges.append(0)
+            node_flags.append(self.node_flags[node])
+            if node_sources is not None:
+                node_sources.append(self.node_sources[node])
+
+            children = []
+            first = self.node_first[node]
+            for edge in range(first, first + self.node_edges[node]):
+                code = self.buffer[self.letters_offset + edge]
+                if counts[code]:
+                    counts[code] -= 1
+                    child = copy_node(self.edge_nodes[edge])
+                    counts[code] += 1
+                    if child is not None:
+                        children.append((code, child))
+
+            # Nothing below can be spelt, drop the node
+            if not children and not self.node_flags[node] & FLAG_WORD and new_node != self.ROOT:
+                del node_first[new_node:], node_edges[new_node:], node_flags[new_node:]
+                if node_sources is not None:
+                    del node_sources[new_node:]
+                return None
+
+            node_first[new_node] = len(edge_nodes)
+            node_edges[new_node] = len(children)
+            for code, child in children:
+                edge_letters.append(code)
+                edge_nodes.append(child)
+            return new_node
+
+        copy_node(self.ROOT)
+        dictionary = CompactDictionary(_pack(self.alphabet, node_first, edge_nodes, node_edges, node_flags, edge_letters,
+                                             sources=self.sources, node_sources=node_sources))
+        dictionary.name = self.name
+        return dictionary
+
+    def entries(self):
+        """
+        Get the words in order, along with the ends of letters that are not words, to rebuild the dictionary from
+        :return: (generator) Letters and whether they are a word
+        """
+        edge_letters = [self.alphabet[code] for code in self.buffer[self.letters_offset:self.letters_offset + self.edge_count]]
+        node_first, node_edges, node_flags, edge_nodes = self.node_first, self.node_edges, self.node_flags, self.edge_nodes
+
+        nodes = [('', self.ROOT)]
+        while nodes:
+            letters, node = nodes.pop()
+            first, count = node_first[node], node_edges[node]
+            if letters and (count == 0 or node_flags[node] & FLAG_WORD):
+                yield letters, bool(node_flags[node] & FLAG_WORD)
+            # Last letter first, so the first comes off next
+            children = [(letters + edge_letters[edge], edge_nodes[edge]) for edge in range(first, first + count)]
+            children.sort(reverse=True)
+            nodes.extend(children)
+
+    def to_tree(self):
+        """
+        Expand the tables into a hierarchy of letters
+        :return: (dict) Hierarchy of letters, words end with '\\n'
+        """
+        if self._tree is not None:
+            return self._tree
+
+        nodes = [{} for _ in range(self.node_count)]
+        for node in range(self.node_count):
+            first = self.node_first[node]
+            for edge in range(first, first + self.node_edges[node]):
+                letter = self.alphabet[self.buffer[self.letters_offset + edge]]
+                nodes[node][letter] = nodes[self.edge_nodes[edge]]
+            if self.node_flags[node] & FLAG_WORD:
+                nodes[node]['\n'] = {}
+        self._tree = nodes[self.ROOT]
+        return self._tree
+
+
+class DictionaryBuilder:
+    """
+    Build the compact tables from words in order, a node at a time
+    Nodes are numbered as they are reached, a node's edges are added once the letters have moved past it
+    """
+
+    def __init__(self, sources=None):
+        """
+        Start an empty dictionary
+        :param sources: (list) Names of the dictionaries a union is made from, see CompactDictionary.union, None if not
+        """
+        self.sources = sources
+        self.node_sources = array.array('I') if sources is not None else None
+        self.alphabet = {}
+        self.node_first, self.edge_nodes = array.array('I'), array.array('I')
+        self.node_edges, self.node_flags, self.edge_letters = bytearray(), bytearray(), bytearray()
+        self.node_shortest, self.node_longest = bytearray(), bytearray()
+        # Letters of the open nodes and the open nodes, from the root, with the letters and nodes below each
+        self.letters = ''
+        self.path = [(self._new_node(), [])]
+
+    def add(self, letters, word=True, sources=0):
+        """
+        Add letters, in order after the letters added before
+        :param letters: (string) Letters
+        :param word: (bool) Letters are a word, otherwise only the start of words
+        :param sources: (int) For a union, a bit for each dictionary with the word
+        :return: (void)
+        """
+        if letters < self.letters:
+            raise ValueError('Letters must be added in order: {} after {}'.format(letters, self.letters))
+
+        # Close the nodes that are past
+        shared = 0
+        for letter, previous in zip(letters, self.letters):
+            if letter != previous:
+                break
+            shared += 1
+        while len(self.path) > shared + 1:
+            self._close(*self.path.pop())
+
+        for letter in letters[shared:]:
+            node = self._new_node()
+            self.path[-1][1].append((letter, node))
+            self.path.append((node, []))
+        self.letters = letters
+        if word:
+            self.node_flags[self.path[-1][0]] = FLAG_WORD
+            if self.node_sources is not None:
+                self.node_sources[self.path[-1][0]] = sources
+
+    def build(self, entries, remove=()):
+        """
+        Add letters and make the dictionary
+        :param entries: (iterable) Letters and whether they are a word, in order
+        :param remove: (set) Words to leave out
+        :return: (CompactDictionary) Dictionary
+        """
+        for letters, word in entries:
+            if letters not in remove:
+                self.add(letters, word)
+        return self.finish()
+
+    def finish(self):
+        """
+        Close the open nodes and make the dictionary
+        :return: (CompactDictionary) Dictionary
+        """
+        while self.path:
+            self._close(*self.path.pop())
+        return CompactDictionary(_pack(''.join(self.alphabet), self.node_first, self.edge_nodes, self.node_edges,
+                                       self.node_flags, self.edge_letters, self.node_shortest, self.node_longest,
+                                       self.sources, self.node_sources))
+
+    def _new_node(self):
+        """
+        Number a node, its edges are added when it is closed
+        :return: (int) Node
+        """
+        self.node_first.append(0)
+        self.node_edges.append(0)
+        self.node_flags.append(0)
+        if self.node_sources is not None:
+            self.node_sources.append(0)
+        self.node_shortest.append(NO_WORD)
+        self.node_longest.append(NO_WORD)
+        return len(self.node_flags) - 1
+
+    def _close(self, node, children):
+        """
+        Add the edges of a node
+        :param node: (int) Node
+        :param children: (list) Letters and the nodes they lead to
+        :return: (void)
+        """
+        self.node_first[node] = len(self.edge_nodes)
+        self.node_edges[node] = len(children)
+        for letter, child in children:
+            if letter not in self.alphabet:
+                if len(self.alphabet) >= 255:
+                    raise ValueError('Too many distinct letters for a compact dictionary')
+                self.alphabet[letter] = len(self.alphabet)
+            self.edge_letters.append(self.alphabet[letter])
+            self.edge_nodes.append(child)
+        # The nodes below are closed first, so the words through them are known
+        node_shortest, node_longest = self.node_shortest, self.node_longest
+        node_shortest[node], node_longest[node] = _lengths(
+            self.node_flags[node], ((node_shortest[child], node_longest[child]) for _, child in children))
+
+
+def _lengths(flags, children_lengths):
+    """
+    Get the letters still to come in the shortest and longest words through a node
+    :param flags: (int) Flags of the node
+    :param children_lengths: (iterable) Shortest and longest word through each child of the node
+    :return: (tuple) Shortest and longest letters, NO_WORD if no word continues
+    """
+    shortest, longest = (0, 0) if flags & FLAG_WORD else (NO_WORD, NO_WORD)
+    for child_shortest, child_longest in children_lengths:
+        if child_longest == NO_WORD:
+            continue
+        shortest = min(shortest, child_shortest + 1, NO_WORD - 1)
+        if longest == NO_WORD or child_longest >= longest:
+            longest = min(child_longest + 1, NO_WORD - 1)
+    return shortest, longest
+
+
+def _pack(alphabet, node_first, edge_nodes, node_edges, node_flags, edge_letters, node_shortest=None, node_longest=None,
+          sources=None, node_sources=None):
+    """
+    Lay out the tables of a compact dictionary
+    :param alphabet: (string) Letters, in code order
+    :param node_first: (array) Index of each node's first edge
+    :param edge_nodes: (array) Node each edge leads to
+    :param node_edges: (bytearray) Number of edges from each node
+    :param node_flags: (bytearray) Flags for each node
+    :param edge_letters: (bytearray) Letter code of each edge
+    :param node_shortest: (bytearray) Shortest word through each node, None to work out from the other tables
+    :param node_longest: (bytearray) Longest word through each node, None to work out from the other tables
+    :param sources: (list) Names of the dictionaries a union is made from, None if not a union
+    :param node_sources: (array) For a union, the dictionaries with the word ending at each node
+    :return: (bytes) Compact dictionary
+    """
+    if node_shortest is None or node_longest is None:
+        # Nodes are numbered after their parents, so from the last node up every child is done before its parent
+        node_shortest, node_longest = bytearray(len(node_flags)), bytearray(len(node_flags))
+        for node in range(len(node_flags) - 1, -1, -1):
+            first = node_first[node]
+            node_shortest[node], node_longest[node] = _lengths(
+                node_flags[node], [(node_shortest[edge_nodes[edge]], node_longest[edge_nodes[edge]])
+                                   for edge in range(first, first + node_edges[node])])
+
+    alphabet = alphabet.encode('utf-8')
+    names = '\n'.join(sources or []).encode('utf-8')
+    node_sources = node_sources if sources else array.array('I')
+    if sys.byteorder != 'little':
+        node_first, edge_nodes, node_sources = (array.array('I', node_first), array.array('I', edge_nodes),
+                                                array.array('I', node_sources))
+        node_first.byteswap()
+        edge_nodes.byteswap()
+        node_sources.byteswap()
+
+    return b''.join((
+        COMPACT_HEADER.pack(COMPACT_MAGIC, COMPACT_VERSION, len(alphabet), len(node_first), len(edge_nodes),
+                            len(sources or []), len(names)),
+        alphabet, bytes(-len(alphabet) % 4),
+        names, bytes(-len(names) % 4),
+        node_first.tobytes(), edge_nodes.tobytes(), node_sources.tobytes(),
+        bytes(node_edges), bytes(node_flags), bytes(node_shortest), bytes(node_longest), bytes(edge_letters),
+    ))
+
+
+def _table(buffer, offset, count, type_code):
+    """
+    View part of a buffer as a table of numbers, without copying when possible
+    :param buffer: (bytes|mmap) Compact dictionary
+    :param offset: (int) Start of the table
+    :param count: (int) Number of entries
+    :param type_code: (string) 'I' for uint32 or 'B' for uint8
+    :return: (memoryview|array) Table
+    """
+    size = array.array(type_code).itemsize
+    view = memoryview(buffer)[offset:offset + count * size]
+    if type_code == 'B' or sys.byteorder == 'little':
+        return view.cast(type_code)
+
+    # Stored little endian, copy and swap on big endian machines
+    table = array.array(type_code, view.tobytes())
+    table.byteswap()
+    return table
 
 
 if __name__ == '__main__':
@@ -108,18 +777,39 @@ if __name__ == '__main__':
     parser.add_argument('-s', '--source', type=argparse.FileType('r'),
                         action='store', dest='source', default=None,
                         metavar='PATH',
-                        help='Source dictionary to create the hierarchy dictionary from or test',
-                        required=True)
+                        help='Source dictionary to create the hierarchy dictionary from or test\n'
+                             'Words are read a line at a time, lists in order build without holding the words')
     parser.add_argument('-a', '--add',
                         action='store', dest='add_words', default=None, nargs='*',
                         metavar='ADDITIONAL_WORD',
                         help='Words to add in addition to the source')
+    parser.add_argument('-r', '--remove',
+                        action='store', dest='remove_words', default=None, nargs='*',
+                        metavar='WORD',
+                        help='Words to leave out of the dictionary created')
+    parser.add_argument('-u', '--union', type=argparse.FileType('rb'),
+                        action='store', dest='union', default=None, nargs='+',
+                        metavar='PATH',
+                        help='Dictionaries to search together, each word marked with the dictionaries that have it\n'
+                             'The source and words added, if any, are one more')
+    parser.add_argument('-m', '--merge', type=argparse.FileType('rb'),
+                        action='store', dest='merge', default=None,
+                        metavar='PATH',
+                        help='Dictionary to add the source and words to, or remove words from, without the list it was made from\n'
+                             'The dictionary is rebuilt in full from its words, taking about as long as building from the list\n'
+                             'May be the dictionary being created')
 
     # Destination
-    parser.add_argument('-d', '--dictionary', type=argparse.FileType('wb+'),
+    parser.add_argument('-d', '--dictionary', type=str,
                         action='store', dest='dictionary', default=None,
                         metavar='PATH',
                         help='Dictionary to create')
+    parser.add_argument('-f', '--format', choices=['compact', 'pickle'],
+                        action='store', dest='format', default='compact',
+                        help='Format of the dictionary to create\n'
+                             'compact: flat tables, memory mapped by the solver\n'
+                             'pickle: hierarchy of letters, the original format\n'
+                             'Default: %(default)s')
 
     # Lookups
     parser.add_argument('-w', '--word',
@@ -130,7 +820,19 @@ if __name__ == '__main__':
                         action='store_true', dest='exact', default=False,
                         help='Match only whole word\n'
                              'Default: %(default)s')
+    parser.add_argument('-l', '--lookup', type=argparse.FileType('r'),
+                        action='store', dest='lookup', default=None,
+                        metavar='PATH',
+                        help='Words or partial words to lookup, one per line, - for stdin\n'
+                             'Each is written with a tab and hit or miss, words/s is reported on stderr')
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'),
+                        action='store', dest='output', default=sys.stdout,
+                        metavar='PATH',
+                        help='Where to write the lookups\n'
+                             'Default: stdout')
 
     options = parser.parse_args()
+    if options.source is None and (options.dictionary is None or (options.merge is None and options.union is None)):
+        parser.error('a source is required, unless merging into a dictionary or making a union')
 
     main()